@@ -1,6 +1,72 @@
 use std::env;
+use std::fs;
+use std::path::{Path, PathBuf};
+use std::process::Command;
+
+fn rerun_if_sources_changed(dir: &Path) {
+    // Listed one by one instead of the directory, so the __pycache__ files
+    // Python writes next to the sources do not trigger a rerun.
+    let mut entries: Vec<PathBuf> = fs::read_dir(dir)
+        .unwrap()
+        .map(|entry| entry.unwrap().path())
+        .collect();
+    entries.sort();
+    for path in entries {
+        if path.is_dir() {
+            if path.file_name().unwrap() != "__pycache__" {
+                rerun_if_sources_changed(&path);
+            }
+        } else if path.extension().map_or(false, |ext| ext == "py") {
+            println!("cargo:rerun-if-changed={}", path.display());
+        }
+    }
+}
 
 fn main() {
-    let vulkan_sdk = env::var("VULKAN_SDK").unwrap();
-    println!("cargo:rustc-link-search=native={}/lib", vulkan_sdk);
+    println!("cargo:rerun-if-changed=build.rs");
+    println!("cargo:rerun-if-env-changed=VULKAN_SDK");
+    println!("cargo:rerun-if-env-changed=VK_XML");
+    println!("cargo:rerun-if-env-changed=PYTHON");
+
+    if let Ok(vulkan_sdk) = env::var("VULKAN_SDK") {
+        println!("cargo:rustc-link-search=native={}/lib", vulkan_sdk);
+    }
+
+    let manifest_dir = PathBuf::from(env::var("CARGO_MANIFEST_DIR").unwrap());
+    let vk_xml = env::var("VK_XML")
+        .map(PathBuf::from)
+        .unwrap_or_else(|_| manifest_dir.join("Vulkan-Docs/xml/vk.xml"));
+    let python = env::var("PYTHON").unwrap_or_else(|_| "python3".to_string());
+    let generator = manifest_dir.join("generator/vkxml2rs");
+    let out_dir = PathBuf::from(env::var("OUT_DIR").unwrap());
+    println!("cargo:rerun-if-changed={}", vk_xml.display());
+
+    // src/lib.rs only includes the bindings when they were generated, so
+    // the crate still builds from a checkout without the Vulkan-Docs
+    // submodule.
+    println!("cargo:rustc-check-cfg=cfg(vk_bindings)");
+    if !vk_xml.is_file() {
+        println!(
+            "cargo:warning=Vulkan registry not found at {}, skipping the vk \
+             bindings. Set VK_XML to the path of vk.xml, or check out \
+             Vulkan-Docs next to Cargo.toml.",
+            vk_xml.display()
+        );
+        return;
+    }
+    rerun_if_sources_changed(&generator);
+
+    // vkxml2rs answers from its stamp file when neither the registry nor the
+    // generator changed since the last run. Its parse cache is kept under
+    // OUT_DIR as well, so the build writes nowhere else.
+    let status = Command::new(&python)
+        .arg(generator.join("vkxml2rs.py"))
+        .arg("--cache-dir")
+        .arg(out_dir.join("vkxml2rs-cache"))
+        .arg(&vk_xml)
+        .arg(out_dir.join("vk"))
+        .status()
+        .unwrap_or_else(|e| panic!("failed to run {}: {}", python, e));
+    assert!(status.success(), "vkxml2rs failed on {}", vk_xml.display());
+    println!("cargo:rustc-cfg=vk_bindings");
 }
@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'vkxml2rs'))
+
+from modules.elements import *
+from modules.emit import Emitter
+from modules.render import HEADER, emit_elements
+
+
+def make_elements(structs: int, members: int, enums: int, values: int):
+    elements = []
+    for i in range(enums):
+        elements.append(Enums('VkEnum' + str(i), [
+            Enum('VK_ENUM_' + str(i) + '_VALUE_' + str(j), j)
+            for j in range(values)]))
+    for i in range(structs):
+        elements.append(Struct('VkStruct' + str(i), [
+            Member('member' + str(j), type_ref('const uint32_t *'))
+            for j in range(members)]))
+    return elements
+
+
+# The former implementation, vendored: to_rs built each element with
+# string concatenation, producing the same text the Emitter streams today.
+def concat_enums_rs(enums: Enums):
+    repr_type = 'u32' if enums.bitmask else 'i32'
+    rs = '#[repr(transparent)]\n'
+    rs += '#[derive(Copy, Clone, PartialEq, Eq, Hash, Debug)]\n'
+    rs += 'pub struct ' + enums.name + '(pub ' + repr_type + ');\n'
+    for e in enums.enums:
+        rs += ('pub const ' + e.name + ': ' + enums.name + ' = ' +
+               enums.name + '(' + str(e.value) + ');\n')
+    return rs
+
+
+def concat_struct_rs(struct: Struct):
+    rs = '#[repr(C)]\n'
+    rs += '#[derive(Copy, Clone)]\n'
+    rs += 'pub struct ' + struct.name + ' {\n'
+    for m in struct.members:
+        rs += '    pub ' + rs_name(m.name) + ': ' + m.type_.rs() + ',\n'
+    rs += '}\n'
+    return rs
+
+
+CONCAT_TO_RS = {Enums: concat_enums_rs, Struct: concat_struct_rs}
+
+
+def concat_emit(path: str, elements: list):
+    # The former approach: every element is rendered to its own string and
+    # the whole binding is concatenated in memory before it is written.
+    rs = HEADER + 'use std::os::raw::*;\n\n'
+    for element in elements:
+        rs += CONCAT_TO_RS[type(element)](element)
+    with open(path, 'w') as f:
+        f.write(rs)
+
+
+def stream_emit(path: str, elements: list):
+    with open(path, 'w') as f, Emitter(f) as out:
+        emit_elements(out, elements)
+
+
+def measure(emit, path: str, elements: list):
+    tracemalloc.start()
+    start = time.perf_counter()
+    emit(path, elements)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare emit stage throughput and peak memory.')
+    parser.add_argument('--structs', type=int, default=5000)
+    parser.add_argument('--members', type=int, default=20)
+    parser.add_argument('--enums', type=int, default=500)
+    parser.add_argument('--values', type=int, default=100)
+    args = parser.parse_args()
+
+    elements = make_elements(args.structs, args.members,
+                             args.enums, args.values)
+    with tempfile.TemporaryDirectory() as tmp:
+        contents = []
+        for name, emit in [('concat', concat_emit), ('stream', stream_emit)]:
+            path = os.path.join(tmp, name + '.rs')
+            elapsed, peak, size = measure(emit, path, elements)
+            print('%-8s %8.3f s %8.1f MB/s peak %8.1f KB' % (
+                name, elapsed, size / elapsed / 1e6, peak / 1024))
+            with open(path) as f:
+                contents.append(f.read())
+        assert contents[0] == contents[1], 'Outputs differ'
+
+
+if __name__ == '__main__':
+    main()
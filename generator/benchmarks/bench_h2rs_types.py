@@ -0,0 +1,134 @@
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'h2rs'))
+
+from clang.cindex import Index, TranslationUnit
+
+import h2rs
+
+FIELD_TYPES = ['uint32_t', 'int', 'float', 'const char*', 'void*',
+               'const char* const*', 'float', 'double', 'uint64_t',
+               'unsigned short']
+
+
+def write_header(path: str, structs: int, fields: int):
+    with open(path, 'w') as f:
+        f.write('#include <stdint.h>\n')
+        for i in range(structs):
+            f.write('typedef struct S' + str(i) + ' {\n')
+            for j in range(fields):
+                f.write('    ' + FIELD_TYPES[j % len(FIELD_TYPES)] +
+                        ' f' + str(j) + ';\n')
+            f.write('    float m[4];\n} S' + str(i) + ';\n')
+            f.write('int fn' + str(i) + '(const S' + str(i) + '* s, '
+                    'uint32_t count, void** out);\n')
+    return path
+
+
+def spelling_convert(c_type: str):
+    # The former approach: regexes over the canonical spelling, compiled and
+    # with the mapping rebuilt on every call.
+    pattern = re.compile(r'(^const )')
+    match = pattern.search(c_type)
+    if match:
+        is_const = True
+        c_type = c_type[match.end():]
+    else:
+        is_const = False
+
+    pattern = re.compile(r'(\*$)')
+    match = pattern.search(c_type)
+    if match:
+        is_pointer = True
+        c_type = c_type[0:match.start() - 1:]
+    else:
+        is_pointer = False
+
+    pattern = re.compile(r'(^struct )|(^enum )|(^union )')
+    match = pattern.search(c_type)
+    if match:
+        c_type = c_type[match.end():]
+
+    pattern = re.compile(r'\[\d+\]')
+    match = pattern.search(c_type)
+    if match:
+        is_array = True
+        array_length = c_type[match.start() + 1:match.end() - 1]
+        t = c_type[0: match.start() - 1]
+    else:
+        is_array = False
+        t = c_type
+
+    mapping = {
+        'char': 'c_char',
+        'double': 'c_double',
+        'float': 'c_float',
+        'int': 'c_int',
+        'unsigned int': 'c_uint',
+        'unsigned long': 'c_ulong',
+        'unsigned short': 'c_short',
+        'void': 'c_void',
+    }
+
+    rs_type = mapping.get(t, t)
+    if is_array:
+        rs_type = '[' + rs_type + '; ' + array_length + ']'
+    if is_pointer:
+        rs_type = ('*const ' if is_const else '*mut ') + rs_type
+    return rs_type
+
+
+def typed_cursors(tu):
+    cursors = []
+    for node, depth in h2rs.walk(tu.cursor, h2rs.FileFilter(),
+                                 lambda node: True):
+        if node.kind.name in ('FIELD_DECL', 'PARM_DECL'):
+            cursors.append(node)
+    return cursors
+
+
+def measure_spelling(cursors: list):
+    start = time.perf_counter()
+    for cursor in cursors:
+        spelling_convert(cursor.type.get_canonical().spelling)
+    return time.perf_counter() - start
+
+
+def measure_type_api(cursors: list):
+    h2rs.type_cache.clear()
+    start = time.perf_counter()
+    for cursor in cursors:
+        h2rs.convert_type(cursor.type)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare h2rs type conversion on field and parameter '
+        'declarations.')
+    parser.add_argument('--structs', type=int, default=2000)
+    parser.add_argument('--fields', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_header(os.path.join(tmp, 'types.h'),
+                            args.structs, args.fields)
+        tu = Index.create().parse(
+            path, options=TranslationUnit.PARSE_SKIP_FUNCTION_BODIES)
+        cursors = typed_cursors(tu)
+
+        for name, measure in [('spelling', measure_spelling),
+                              ('type-api', measure_type_api)]:
+            elapsed = measure(cursors)
+            print('%-8s %8.3f s %10.0f decls/s' % (
+                name, elapsed, len(cursors) / elapsed))
+        print(str(len(h2rs.type_cache)) + ' distinct types')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'vkxml2rs'))
+
+from modules.elements import Elements
+from modules.graph import DependencyGraph
+from modules.output import write_outputs
+from modules.parse import merge_extension_enums, parse_registry
+from modules.render import sharded_outputs
+from modules.symbols import resolve_aliases
+from synthetic import write_registry
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+STAGES = ['parse', 'resolve', 'convert', 'emit']
+
+# Fixed parse and format workload. Its time on the machine that recorded the
+# baseline and on the current one scales the baseline timings, so that a
+# slower machine does not report every stage as a regression.
+CALIBRATION_XML = ('<types>' + ''.join(
+    '<type category="struct" name="VkStruct%d"><member><type>uint32_t'
+    '</type> <name>member%d</name></member></type>' % (i, i)
+    for i in range(20000)) + '</types>').encode()
+
+
+def run_stages(xml_path: str, out_dir: str):
+    # Yields after every stage so the caller can measure it.
+    elements = Elements()
+    pending = {}
+    parse_registry(xml_path, elements, pending)
+    yield 'parse'
+
+    merge_extension_enums(elements, pending)
+    resolve_aliases(elements)
+    yield 'resolve'
+
+    graph = DependencyGraph(elements)
+    outputs = sharded_outputs(elements, graph)
+    yield 'convert'
+
+    write_outputs(out_dir, outputs)
+    yield 'emit'
+
+
+def calibration_run():
+    out = io.StringIO()
+    for node in ET.fromstring(CALIBRATION_XML):
+        out.write('pub struct %s {\n' % node.get('name'))
+        for member in node:
+            out.write('    pub %s: %s,\n' % (member.find('name').text,
+                                              member.find('type').text))
+        out.write('}\n')
+    return out.getvalue()
+
+
+def calibrate(repeat: int):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calibration_run()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def measure_times(xml_path: str, out_dir: str, repeat: int):
+    # Best of several runs, a single run picks up too much scheduler and
+    # disk noise.
+    times = {}
+    for i in range(repeat):
+        start = time.perf_counter()
+        for stage in run_stages(xml_path, os.path.join(out_dir, str(i))):
+            now = time.perf_counter()
+            times[stage] = min(times.get(stage, now - start), now - start)
+            start = now
+    return times
+
+
+def measure_peaks(xml_path: str, out_dir: str):
+    # Traced separately from the timings, tracemalloc slows everything down.
+    peaks = {}
+    tracemalloc.start()
+    for stage in run_stages(xml_path, out_dir):
+        peaks[stage] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+    tracemalloc.stop()
+    return peaks
+
+
+def run_benchmarks(scales: list, repeat: int = 1):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            xml_path = write_registry(
+                os.path.join(tmp, 'vk' + str(scale) + '.xml'), scale)
+            times = measure_times(xml_path, os.path.join(tmp, 'times'),
+                                  repeat)
+            peaks = measure_peaks(xml_path, os.path.join(tmp, 'peaks'))
+            results[str(scale) + 'x'] = dict(
+                (stage, {'seconds': times[stage],
+                         'peak_kb': peaks[stage] // 1024})
+                for stage in STAGES)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float,
+            min_seconds: float, calibration: float = None):
+    # Baseline timings are scaled by how much slower this machine runs the
+    # calibration workload. Baselines without a calibration are taken as is.
+    speed = 1.0
+    if calibration is not None and baseline.get('calibration'):
+        speed = calibration / baseline['calibration']
+
+    regressions = []
+    for scale, stages in results.items():
+        for stage, metrics in stages.items():
+            expected = baseline.get(scale, {}).get(stage)
+            if expected is None:
+                continue
+            for metric, value in metrics.items():
+                limit = expected[metric] * tolerance
+                # Very short stages are too noisy to compare by ratio alone.
+                if metric == 'seconds':
+                    limit = max(limit * speed,
+                                expected[metric] * speed + min_seconds)
+                if value > limit:
+                    regressions.append('%s %s %s: %.3f > %.3f' % (
+                        scale, stage, metric, value, limit))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Time and trace every vkxml2rs stage on synthetic '
+        'registries. Timings are compared after scaling the baseline by a '
+        'calibration workload, which evens out plain machine speed but not '
+        'every difference between machines: treat regressions as advisory '
+        'until the baseline is recorded on the machine that checks it.')
+    parser.add_argument('--scale', type=int, action='append', dest='scales',
+                        help='Registry size relative to the real vk.xml. '
+                        'May be repeated. Defaults to 1, 5 and 20.')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='Baseline JSON path.')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Allowed ratio over the baseline.')
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help='Time differences below this never count as '
+                        'a regression.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per scale, the fastest one counts.')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Store the results as the new baseline.')
+    args = parser.parse_args()
+
+    calibration = calibrate(args.repeat)
+    results = run_benchmarks(args.scales or [1, 5, 20], args.repeat)
+    print('calibration %.3f s' % calibration)
+    for scale, stages in results.items():
+        for stage, metrics in stages.items():
+            print('%-4s %-8s %8.3f s %10d KB' % (
+                scale, stage, metrics['seconds'], metrics['peak_kb']))
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(results, calibration=calibration), f, indent=2,
+                      sort_keys=True)
+            f.write('\n')
+        return
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except OSError:
+        print('no baseline at ' + args.baseline)
+        return
+
+    regressions = compare(results, baseline, args.tolerance,
+                          args.min_seconds, calibration)
+    for regression in regressions:
+        print('regression: ' + regression)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
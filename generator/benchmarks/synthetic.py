@@ -0,0 +1,241 @@
+import argparse
+import random
+
+# Rough element counts of a 1.2.1xx vk.xml, used as the 1x scale.
+REAL_COUNTS = {
+    'groups': 300,
+    'structs_per_group': 2,
+    'members_per_struct': 8,
+    'values_per_enum': 8,
+    'commands_per_group': 1,
+}
+
+BASETYPES = [
+    ('VkFlags', 'uint32_t'),
+    ('VkBool32', 'uint32_t'),
+    ('VkDeviceSize', 'uint64_t'),
+    ('VkDeviceAddress', 'uint64_t'),
+    ('VkSampleMask', 'uint32_t'),
+]
+
+PRIMITIVES = ['uint32_t', 'uint64_t', 'int32_t', 'float', 'size_t',
+              'VkBool32', 'VkDeviceSize']
+
+
+class RegistryWriter:
+    def __init__(self, file, scale: int, seed: int = 0):
+        self.file = file
+        self.groups = REAL_COUNTS['groups'] * scale
+        self.random = random.Random(seed)
+
+    def write(self, *fragments):
+        self.file.write(''.join(fragments))
+
+    def group_name(self, i: int):
+        return 'Synthetic' + str(i)
+
+    def extension_name(self, i: int):
+        return 'VK_EXT_synthetic_' + str(i)
+
+    def write_types(self):
+        self.write('    <types comment="Vulkan type definitions">\n')
+        self.write('        <type category="include" name="vk_platform">'
+                   '#include "vk_platform.h"</type>\n')
+        for name, typedef in BASETYPES:
+            self.write('        <type category="basetype">typedef <type>',
+                       typedef, '</type> <name>', name, '</name>;</type>\n')
+
+        self.write('        <type category="handle"><type>VK_DEFINE_HANDLE'
+                   '</type>(<name>VkInstance</name>)</type>\n')
+        self.write('        <type category="handle" parent="VkInstance">'
+                   '<type>VK_DEFINE_HANDLE</type>(<name>VkDevice</name>)'
+                   '</type>\n')
+        self.write('        <type category="enum" name="VkStructureType"/>\n')
+        self.write('        <type category="enum" name="VkResult"/>\n')
+
+        for i in range(self.groups):
+            self.write_group_types(i)
+
+        self.write('    </types>\n')
+
+    def write_group_types(self, i: int):
+        group = self.group_name(i)
+        vk = 'Vk' + group
+        self.write('        <type category="enum" name="', vk, 'Mode"/>\n')
+        self.write('        <type requires="', vk, 'FlagBits" '
+                   'category="bitmask">typedef <type>VkFlags</type> <name>',
+                   vk, 'Flags</name>;</type>\n')
+        self.write('        <type category="enum" name="', vk,
+                   'FlagBits"/>\n')
+        self.write('        <type category="handle" parent="VkDevice">'
+                   '<type>VK_DEFINE_NON_DISPATCHABLE_HANDLE</type>(<name>',
+                   vk, '</name>)</type>\n')
+
+        if i % 10 == 0:
+            self.write('        <type category="funcpointer">typedef void '
+                       '(VKAPI_PTR *<name>PFN_vk', group,
+                       'Callback</name>)(\n'
+                       '    <type>', vk, '</type>                 object,\n'
+                       '    const <type>char</type>*             pMessage,\n'
+                       '    <type>void</type>*                   pUserData);'
+                       '</type>\n')
+
+        for j in range(REAL_COUNTS['structs_per_group']):
+            name = vk + 'Info' + str(j)
+            self.write('        <type category="struct" name="', name, '">\n')
+            self.write('            <member values="VK_STRUCTURE_TYPE_',
+                       group.upper(), '_INFO_', str(j), '"><type>'
+                       'VkStructureType</type> <name>sType</name></member>\n')
+            self.write('            <member>const <type>void</type>*     '
+                       '<name>pNext</name></member>\n')
+            self.write('            <member optional="true"><type>', vk,
+                       'Flags</type> <name>flags</name></member>\n')
+            self.write('            <member><type>', vk,
+                       'Mode</type> <name>mode</name></member>\n')
+            for k in range(REAL_COUNTS['members_per_struct'] - 4):
+                member_type = self.random.choice(PRIMITIVES)
+                if i > 0 and self.random.random() < 0.2:
+                    member_type = 'Vk' + self.group_name(
+                        self.random.randrange(i)) + 'Info0'
+                self.write('            <member><type>', member_type,
+                           '</type> <name>member', str(k),
+                           '</name></member>\n')
+            self.write('        </type>\n')
+            if j == 0:
+                self.write('        <type category="struct" name="', name,
+                           'KHR" alias="', name, '"/>\n')
+
+        if i % 50 == 0:
+            self.write('        <type category="union" name="', vk,
+                       'Value">\n'
+                       '            <member><type>float</type> '
+                       '<name>float32</name>[4]</member>\n'
+                       '            <member><type>uint32_t</type> '
+                       '<name>uint32</name>[4]</member>\n'
+                       '        </type>\n')
+
+    def write_enums(self):
+        self.write('    <enums name="API Constants" comment="Vulkan hardcoded '
+                   'constants">\n'
+                   '        <enum value="256" name="VK_MAX_NAME_SIZE"/>\n'
+                   '    </enums>\n')
+        self.write('    <enums name="VkStructureType" type="enum">\n'
+                   '        <enum value="0" name="VK_STRUCTURE_TYPE_'
+                   'APPLICATION_INFO"/>\n'
+                   '    </enums>\n')
+        self.write('    <enums name="VkResult" type="enum">\n'
+                   '        <enum value="0" name="VK_SUCCESS"/>\n'
+                   '        <enum value="-1" name="VK_ERROR_OUT_OF_HOST_'
+                   'MEMORY"/>\n'
+                   '    </enums>\n')
+
+        for i in range(self.groups):
+            prefix = 'VK_' + self.group_name(i).upper()
+            vk = 'Vk' + self.group_name(i)
+            self.write('    <enums name="', vk, 'Mode" type="enum">\n')
+            for j in range(REAL_COUNTS['values_per_enum']):
+                self.write('        <enum value="', str(j), '" name="',
+                           prefix, '_MODE_', str(j), '"/>\n')
+            self.write('        <enum name="', prefix, '_MODE_DEFAULT" '
+                       'alias="', prefix, '_MODE_0"/>\n')
+            self.write('    </enums>\n')
+
+            self.write('    <enums name="', vk, 'FlagBits" type="bitmask">\n')
+            for j in range(REAL_COUNTS['values_per_enum']):
+                self.write('        <enum bitpos="', str(j), '" name="',
+                           prefix, '_', str(j), '_BIT"/>\n')
+            self.write('    </enums>\n')
+
+    def write_commands(self):
+        self.write('    <commands comment="Vulkan command definitions">\n')
+        for i in range(self.groups):
+            group = self.group_name(i)
+            vk = 'Vk' + group
+            for j in range(REAL_COUNTS['commands_per_group']):
+                name = 'vkCreate' + group + '_' + str(j)
+                self.write(
+                    '        <command successcodes="VK_SUCCESS" '
+                    'errorcodes="VK_ERROR_OUT_OF_HOST_MEMORY">\n'
+                    '            <proto><type>VkResult</type> <name>', name,
+                    '</name></proto>\n'
+                    '            <param><type>VkDevice</type> '
+                    '<name>device</name></param>\n'
+                    '            <param>const <type>', vk, 'Info0</type>* '
+                    '<name>pCreateInfo</name></param>\n'
+                    '            <param><type>', vk, '</type>* '
+                    '<name>pObject</name></param>\n'
+                    '        </command>\n')
+                if i % 4 == 0:
+                    self.write('        <command name="', name, 'KHR" alias="',
+                               name, '"/>\n')
+        self.write('    </commands>\n')
+
+    def write_features(self):
+        self.write('    <feature api="vulkan" name="VK_VERSION_1_0" '
+                   'number="1.0">\n'
+                   '        <require>\n'
+                   '            <type name="vk_platform"/>\n'
+                   '            <type name="VkResult"/>\n'
+                   '            <type name="VkStructureType"/>\n'
+                   '        </require>\n'
+                   '    </feature>\n')
+
+    def write_extensions(self):
+        self.write('    <extensions comment="Vulkan extension interface '
+                   'definitions">\n')
+        for i in range(self.groups):
+            group = self.group_name(i)
+            vk = 'Vk' + group
+            self.write('        <extension name="', self.extension_name(i),
+                       '" number="', str(i + 1), '" type="device" '
+                       'supported="vulkan">\n'
+                       '            <require>\n')
+            self.write('                <enum value="1" name="VK_EXT_',
+                       group.upper(), '_SPEC_VERSION"/>\n')
+            for j in range(REAL_COUNTS['structs_per_group']):
+                self.write('                <enum offset="', str(j),
+                           '" extends="VkStructureType" name="'
+                           'VK_STRUCTURE_TYPE_', group.upper(), '_INFO_',
+                           str(j), '"/>\n')
+                self.write('                <type name="', vk, 'Info',
+                           str(j), '"/>\n')
+            self.write('                <enum offset="0" dir="-" '
+                       'extends="VkResult" name="VK_ERROR_', group.upper(),
+                       '_LOST"/>\n')
+            self.write('                <command name="vkCreate', group,
+                       '_0"/>\n')
+            self.write('            </require>\n'
+                       '        </extension>\n')
+        self.write('    </extensions>\n')
+
+    def write_registry(self):
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n<registry>\n'
+                   '    <comment>Synthetic registry</comment>\n')
+        self.write_types()
+        self.write_enums()
+        self.write_commands()
+        self.write_features()
+        self.write_extensions()
+        self.write('</registry>\n')
+
+
+def write_registry(path: str, scale: int = 1, seed: int = 0):
+    with open(path, 'w') as f:
+        RegistryWriter(f, scale, seed).write_registry()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Write a synthetic vk.xml of a given scale.')
+    parser.add_argument('dst', help='Output vk.xml path.')
+    parser.add_argument('--scale', type=int, default=1,
+                        help='Size relative to the real registry.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    write_registry(args.dst, args.scale, args.seed)
+
+
+if __name__ == '__main__':
+    main()
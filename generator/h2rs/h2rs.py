@@ -1,77 +1,91 @@
 import sys
 import os
 import argparse
-import re
-from dataclasses import dataclass
-
-from clang.cindex import Index, Config, TranslationUnit
-
-is_including_other_file = False
-source_file_path = ''
+import hashlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+
+from clang.cindex import Index, Config, TranslationUnit, \
+    TranslationUnitLoadError, TranslationUnitSaveError, TypeKind
+
+PARSE_OPTIONS = TranslationUnit.PARSE_SKIP_FUNCTION_BODIES
+
+# Output order of the converted declarations.
+CATEGORIES = ['enums', 'unions', 'structs', 'functions']
+
+
+class FileFilter:
+    # Decides per file whether its declarations are visited. None allows
+    # every file.
+    def __init__(self, allowed=None):
+        self.allowed = None
+        if allowed is not None:
+            self.allowed = set(os.path.abspath(path) for path in allowed)
+        self.memo = {}
+
+    def __call__(self, node):
+        if self.allowed is None:
+            return True
+        file = node.location.file
+        if file is None:
+            return True
+        name = file.name
+        if name not in self.memo:
+            self.memo[name] = os.path.abspath(name) in self.allowed
+        return self.memo[name]
+
+
+def walk(node, file_filter, descend):
+    # Iterative pre-order traversal. Subtrees from filtered out files are
+    # pruned before descending, and descend decides for the rest.
+    stack = [(node, 0)]
+    while stack:
+        node, depth = stack.pop()
+        yield node, depth
+        if not descend(node):
+            continue
+        children = [child for child in node.get_children()
+                    if file_filter(child)]
+        for child in reversed(children):
+            stack.append((child, depth + 1))
 
 
-def dump(node, file, indent=0):
+def should_dump(node):
     kind = node.kind.name
-    name = node.spelling
-    typ = node.type.get_canonical().spelling
-    f = os.path.basename(node.extent.start.file.name)
+    return kind != 'TYPE_REF' and kind != 'TYPEDEF_DECL'
 
-    should_dump = kind != 'TYPE_REF' and kind != 'TYPEDEF_DECL'
-    # should_dump = True
-    if not is_including_other_file:
-        if f != os.path.basename(source_file_path):
-            should_dump = False
 
-    if should_dump:
+def dump(node, file, file_filter):
+    for node, indent in walk(node, file_filter, should_dump):
+        if not should_dump(node):
+            continue
+        kind = node.kind.name
+        typ = node.type.get_canonical().spelling
         line = '\t' * indent + '[' + kind + '] name: ' + \
-            name + ', type: ' + typ
+            node.spelling + ', type: ' + typ
         if kind == 'ENUM_CONSTANT_DECL':
             line += ', value: ' + str(node.enum_value)
-        # print(line)
         file.write(line + '\n')
 
-        for child in node.get_children():
-            dump(child, file, indent+1)
+
+@dataclass
+class Declaration:
+    usr: str
+    header: str
+    rs: str
 
 
+@dataclass
 class Converted:
-    enums: list = list()
-    unions: list = list()
-    structs: list = list()
-    functions: list = list()
-
-    def __init__(
-            self,
-            enums: list = list(),
-            unions: list = list(),
-            structs: list = list(),
-            functions: list = list()):
-        self.enums = enums
-        self.unions = unions
-        self.structs = structs
-        self.functions = functions
-
-
-def convert(node, converted):
-    kind = node.kind.name
-    if kind == 'ENUM_DECL':
-        converted.enums.append(convert_enum(node))
-        return converted
-    elif kind == 'STRUCT_DECL':
-        converted.structs.append(convert_struct(node))
-        return converted
-    elif kind == 'UNION_DECL':
-        converted.unions.append(convert_union(node))
-        return converted
-    elif kind == 'FUNCTION_DECL':
-        converted.functions.append(convert_function(node))
-        return converted
-    elif kind == 'TYPEDEF_DECL':
-        return converted
-    else:
-        for child in node.get_children():
-            converted = convert(child, converted)
-        return converted
+    # Every instance gets its own lists. Shared defaults would carry
+    # declarations over from one conversion to the next in the same process.
+    enums: list = field(default_factory=list)
+    unions: list = field(default_factory=list)
+    structs: list = field(default_factory=list)
+    functions: list = field(default_factory=list)
 
 
 def convert_enum(node):
@@ -106,9 +120,8 @@ def convert_struct(node):
         for child in node.get_children():
             if child.kind.name == 'FIELD_DECL':
                 field_name = child.spelling
-                field_type = child.type.get_canonical().spelling
                 rust_struct += '    ' + field_name + \
-                    ': ' + convert_primitive_type(field_type) + ',\n'
+                    ': ' + convert_type(child.type) + ',\n'
         rust_struct += '}\n'
     else:
         rust_struct = 'enum ' + struct_name + ' {}\n'
@@ -128,9 +141,8 @@ def convert_union(node):
         for child in node.get_children():
             if child.kind.name == 'FIELD_DECL':
                 field_name = child.spelling
-                field_type = child.type.get_canonical().spelling
                 rust_union += '    ' + field_name + \
-                    ': ' + convert_primitive_type(field_type) + ',\n'
+                    ': ' + convert_type(child.type) + ',\n'
         rust_union += '}\n'
     else:
         rust_union = 'enum ' + union_name + ' {}\n'
@@ -143,8 +155,7 @@ def convert_function(node):
     if node.kind.name != 'FUNCTION_DECL':
         return ''
     func_name = node.spelling
-    return_type = convert_primitive_type(
-        node.result_type.get_canonical().spelling)
+    return_type = convert_type(node.result_type)
 
     if any(True for _ in node.get_children()):
         rust_func = 'fn ' + func_name + '(\n'
@@ -152,8 +163,7 @@ def convert_function(node):
         for child in node.get_children():
             if child.kind.name == 'PARM_DECL':
                 param_name = child.spelling
-                param_type = convert_primitive_type(
-                    child.type.get_canonical().spelling)
+                param_type = convert_type(child.type)
                 if not is_first_param:
                     rust_func += ',\n'
                 rust_func += '    ' + param_name + ': ' + param_type
@@ -174,125 +184,456 @@ def convert_function(node):
     return rust_func
 
 
-def convert_primitive_type(c_type):
-    pattern = re.compile(r'(^const )')
-    match = pattern.search(c_type)
-    if match:
-        is_const = True
-        c_type = c_type[match.end():]
-    else:
-        is_const = False
+CONVERTERS = {
+    'ENUM_DECL': ('enums', convert_enum),
+    'STRUCT_DECL': ('structs', convert_struct),
+    'UNION_DECL': ('unions', convert_union),
+    'FUNCTION_DECL': ('functions', convert_function),
+}
 
-    pattern = re.compile(r'(\*$)')
-    match = pattern.search(c_type)
-    if match:
-        is_pointer = True
-        c_type = c_type[0:match.start() - 1:]
-    else:
-        is_pointer = False
-
-    pattern = re.compile(r'(^struct )|(^enum )|(^union )')
-    match = pattern.search(c_type)
-    if match:
-        c_type = c_type[match.end():]
-
-    pattern = re.compile(r'\[\d+\]')
-    match = pattern.search(c_type)
-    if match:
-        is_array = True
-        s = match.start() + 1
-        e = match.end() - 1
-        array_length = c_type[s:e]
-        t = c_type[0: match.start() - 1]
-    else:
-        is_array = False
-        t = c_type
-
-    mapping = {
-        'bool': 'bool',
-        'char': 'c_char',
-        'double': 'c_double',
-        'float': 'c_float',
-        'int': 'c_int',
-        'signed int': 'c_int',
-        'long': 'c_long',
-        'signed long': 'c_long',
-        'long long': 'c_longlong',
-        'signed long long': 'c_longlong',
-        'short': 'c_short',
-        'signed short': 'c_short',
-        'unsigned char': 'c_uchar',
-        'unsigned int': 'c_uint',
-        'unsigned long': 'c_ulong',
-        'unsigned long long': 'c_ulonglong',
-        'unsigned short': 'c_short',
-        'void': 'c_void',
-    }
-
-    if t in mapping:
-        if is_array:
-            rs_type = '[' + mapping[t] + '; ' + array_length + ']'
-        else:
-            rs_type = mapping[t]
-    else:
-        rs_type = t
 
-    if is_pointer:
-        if is_const:
-            rs_type = '*const ' + rs_type
-        else:
-            rs_type = '*mut ' + rs_type
+def is_container(node):
+    kind = node.kind.name
+    return kind not in CONVERTERS and kind != 'TYPEDEF_DECL'
 
+
+def is_forward_declaration(node):
+    if node.kind.name not in ('STRUCT_DECL', 'UNION_DECL'):
+        return False
+    definition = node.get_definition()
+    return definition is not None and definition != node
+
+
+def header_name(node):
+    file = node.location.file
+    if file is None:
+        return ''
+    return os.path.basename(file.name)
+
+
+def convert(node, converted, file_filter=None):
+    if file_filter is None:
+        file_filter = FileFilter()
+    for node, depth in walk(node, file_filter, is_container):
+        converter = CONVERTERS.get(node.kind.name)
+        if converter is None or is_forward_declaration(node):
+            continue
+        category, convert_decl = converter
+        getattr(converted, category).append(Declaration(
+            node.get_usr(), header_name(node), convert_decl(node)))
+    return converted
+
+
+def merge_converted(results):
+    # The same declaration reached through several headers, or declared
+    # more than once, shares one USR. The first one wins.
+    merged = Converted()
+    seen = set()
+    for converted in results:
+        for category in CATEGORIES:
+            for declaration in getattr(converted, category):
+                if declaration.usr in seen:
+                    continue
+                seen.add(declaration.usr)
+                getattr(merged, category).append(declaration)
+    return merged
+
+
+def write_converted(path, converted):
+    content = ''.join('// ' + declaration.header + '\n' + declaration.rs
+                      for category in CATEGORIES
+                      for declaration in getattr(converted, category))
+
+    # Leave an unchanged output alone so its timestamp does not trigger
+    # rebuilds.
+    try:
+        with open(path) as file:
+            if file.read() == content:
+                return False
+    except OSError:
+        pass
+
+    with open(path, 'w') as file:
+        file.write(content)
+    return True
+
+
+PRIMITIVE_TYPES = {
+    TypeKind.BOOL: 'bool',
+    TypeKind.CHAR_S: 'c_char',
+    TypeKind.CHAR_U: 'c_char',
+    TypeKind.SCHAR: 'c_schar',
+    TypeKind.UCHAR: 'c_uchar',
+    TypeKind.SHORT: 'c_short',
+    TypeKind.USHORT: 'c_ushort',
+    TypeKind.INT: 'c_int',
+    TypeKind.UINT: 'c_uint',
+    TypeKind.LONG: 'c_long',
+    TypeKind.ULONG: 'c_ulong',
+    TypeKind.LONGLONG: 'c_longlong',
+    TypeKind.ULONGLONG: 'c_ulonglong',
+    TypeKind.FLOAT: 'c_float',
+    TypeKind.DOUBLE: 'c_double',
+    TypeKind.VOID: 'c_void',
+}
+
+FUNCTION_TYPES = (TypeKind.FUNCTIONPROTO, TypeKind.FUNCTIONNOPROTO)
+
+# Canonical type spelling -> Rust type. Every distinct type is converted
+# once per process.
+type_cache = {}
+
+
+def convert_type(c_type):
+    canonical = c_type.get_canonical()
+    key = canonical.spelling
+    rs_type = type_cache.get(key)
+    if rs_type is None:
+        rs_type = convert_canonical_type(canonical)
+        type_cache[key] = rs_type
     return rs_type
 
 
-def main():
-    global is_including_other_file
-    global source_file_path
+def convert_canonical_type(c_type):
+    kind = c_type.kind
+    if kind in PRIMITIVE_TYPES:
+        return PRIMITIVE_TYPES[kind]
 
+    if kind == TypeKind.POINTER:
+        pointee = c_type.get_pointee()
+        if pointee.kind in FUNCTION_TYPES:
+            return convert_function_pointer(pointee)
+        if pointee.is_const_qualified():
+            return '*const ' + convert_type(pointee)
+        return '*mut ' + convert_type(pointee)
+
+    if kind == TypeKind.CONSTANTARRAY:
+        return '[' + convert_type(c_type.element_type) + '; ' + \
+            str(c_type.element_count) + ']'
+
+    if kind in (TypeKind.INCOMPLETEARRAY, TypeKind.VARIABLEARRAY):
+        return '*mut ' + convert_type(c_type.element_type)
+
+    if kind in (TypeKind.RECORD, TypeKind.ENUM):
+        name = c_type.get_declaration().spelling
+        if name:
+            return name
+
+    return c_type.spelling
+
+
+def convert_function_pointer(c_type):
+    rs_type = 'Option<unsafe extern "C" fn('
+    if c_type.kind == TypeKind.FUNCTIONPROTO:
+        rs_type += ', '.join(convert_type(arg)
+                             for arg in c_type.argument_types())
+    rs_type += ')'
+    return_type = convert_type(c_type.get_result())
+    if return_type != 'c_void':
+        rs_type += ' -> ' + return_type
+    return rs_type + '>'
+
+
+def default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'h2rs')
+
+
+def file_digest(path):
+    sha256 = hashlib.sha256()
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha256.update(chunk)
+    except OSError:
+        return None
+    return sha256.hexdigest()
+
+
+def source_digests(tu, src):
+    # The header itself and everything it pulls in. A change in any of
+    # them invalidates the parsed translation unit.
+    digests = {src: file_digest(src)}
+    for include in tu.get_includes():
+        path = os.path.abspath(include.include.name)
+        if path not in digests:
+            digests[path] = file_digest(path)
+    return digests
+
+
+def is_up_to_date(digests):
+    return all(file_digest(path) == digest
+               for path, digest in digests.items())
+
+
+def tu_cache_path(src, clang_args, cache_dir):
+    # One slot per header and argument list, so a changed header overwrites
+    # its own stale entry.
+    key = hashlib.sha256('\0'.join([src] + clang_args).encode())
+    name = os.path.basename(src) + '-' + key.hexdigest()[:16]
+    return os.path.join(cache_dir, name)
+
+
+def read_tu_cache(index, path, src, clang_args):
+    try:
+        with open(path + '.json') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if entry.get('src') != src or entry.get('args') != clang_args:
+        return None
+    if not is_up_to_date(entry['files']):
+        return None
+
+    try:
+        # Also fails for ASTs written by a different libclang version.
+        tu = TranslationUnit.from_ast_file(path + '.ast', index)
+    except TranslationUnitLoadError:
+        return None
+    return tu, entry['files']
+
+
+def write_tu_cache(tu, path, src, clang_args, digests):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # The AST goes first and the entry that validates it last, so a reader
+    # never trusts a half written cache.
+    tmp_suffix = '.' + str(os.getpid()) + '.tmp'
+    tu.save(path + '.ast' + tmp_suffix)
+    os.replace(path + '.ast' + tmp_suffix, path + '.ast')
+    with open(path + '.json' + tmp_suffix, 'w') as f:
+        json.dump({'src': src, 'args': clang_args, 'files': digests}, f)
+    os.replace(path + '.json' + tmp_suffix, path + '.json')
+
+
+class TranslationUnitCache:
+    def __init__(self, index, clang_args=None, cache_dir=None):
+        self.index = index
+        self.clang_args = list(clang_args or [])
+        self.cache_dir = cache_dir
+        # src -> (tu, digests, has_preamble)
+        self.units = {}
+
+    def parse(self, src):
+        src = os.path.abspath(src)
+        unit = self.units.get(src)
+        if unit is not None:
+            tu, digests, has_preamble = unit
+            changed = [path for path, digest in digests.items()
+                       if file_digest(path) != digest]
+            if not changed:
+                return tu
+            if changed == [src]:
+                return self.reparse(src, tu, has_preamble)
+
+        path = None
+        if self.cache_dir is not None:
+            path = tu_cache_path(src, self.clang_args, self.cache_dir)
+            cached = read_tu_cache(self.index, path, src, self.clang_args)
+            if cached is not None:
+                tu, digests = cached
+                self.units[src] = (tu, digests, False)
+                return tu
+
+        tu = self.index.parse(src, args=self.clang_args,
+                              options=PARSE_OPTIONS)
+        digests = source_digests(tu, src)
+        if path is not None:
+            try:
+                write_tu_cache(tu, path, src, self.clang_args, digests)
+            except (OSError, TranslationUnitSaveError):
+                pass
+        self.units[src] = (tu, digests, False)
+        return tu
+
+    def reparse(self, src, tu, has_preamble):
+        # Only the header itself changed, so its includes can come from a
+        # precompiled preamble. This needs the unit from an earlier parse in
+        # the same process, so only --watch gets here; a one-shot run always
+        # parses or loads from the disk cache. libclang keeps the preamble
+        # with the translation unit, and an AST saved from such a unit cannot
+        # be loaded again, so these are never written to the disk cache.
+        if has_preamble:
+            tu.reparse()
+        else:
+            tu = self.index.parse(
+                src, args=self.clang_args,
+                options=PARSE_OPTIONS |
+                TranslationUnit.PARSE_PRECOMPILED_PREAMBLE)
+        # The edit may have added or removed includes.
+        self.units[src] = (tu, source_digests(tu, src), True)
+        return tu
+
+
+@dataclass
+class Options:
+    clang_args: list = field(default_factory=list)
+    cache_dir: str = None
+    include: bool = False
+    allow: list = field(default_factory=list)
+    library_path: str = None
+
+
+def setup_clang(library_path=None):
+    if library_path is None:
+        library_path = os.environ.get('CLANG_LIBRARY_PATH')
+    if library_path and not Config.loaded:
+        Config.set_library_path(library_path)
+
+
+def convert_header(src, dump_path, options, tu_cache=None):
+    # Runs in a worker process for batches, so it sets up libclang itself
+    # and returns only picklable results.
+    if tu_cache is None:
+        setup_clang(options.library_path)
+        tu_cache = TranslationUnitCache(
+            Index.create(), options.clang_args, options.cache_dir)
+    tu = tu_cache.parse(src)
+
+    file_filter = FileFilter(None if options.include
+                             else [src] + options.allow)
+    if dump_path is not None:
+        with open(dump_path, 'w') as file:
+            dump(tu.cursor, file, file_filter)
+
+    return convert(tu.cursor, Converted(), file_filter)
+
+
+def convert_headers(srcs, dump_paths, options, jobs=1):
+    if jobs > 1 and len(srcs) > 1:
+        # map keeps the header order, so which duplicate wins does not
+        # depend on which worker finishes first.
+        with ProcessPoolExecutor(min(jobs, len(srcs))) as executor:
+            results = executor.map(
+                partial(convert_header, options=options), srcs, dump_paths)
+            return merge_converted(list(results))
+
+    setup_clang(options.library_path)
+    tu_cache = TranslationUnitCache(
+        Index.create(), options.clang_args, options.cache_dir)
+    return merge_converted(
+        convert_header(src, dump_path, options, tu_cache)
+        for src, dump_path in zip(srcs, dump_paths))
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def wait_for_changes(tu_cache, srcs, interval):
+    # Polls the headers and everything they include, and returns the
+    # headers whose translation units are affected by a change.
+    files = {}
+    for src in srcs:
+        # A header that failed to parse is only watched itself.
+        unit = tu_cache.units.get(os.path.abspath(src))
+        files[src] = list(unit[1]) if unit else [src]
+    paths = set(path for src in srcs for path in files[src])
+    signatures = dict((path, file_signature(path)) for path in paths)
+    while True:
+        time.sleep(interval)
+        changed = set(path for path in paths
+                      if file_signature(path) != signatures[path])
+        if changed:
+            return set(src for src in srcs if changed & set(files[src]))
+
+
+def watch_headers(srcs, dst, dump_paths, options, interval=0.2):
+    # Translation units and per header results stay in memory. A change
+    # reconverts only the headers it affects, and a header whose includes
+    # did not change is reparsed with its precompiled preamble.
+    setup_clang(options.library_path)
+    tu_cache = TranslationUnitCache(
+        Index.create(), options.clang_args, options.cache_dir)
+    results = {}
+    stale = set(srcs)
+    while True:
+        start = time.perf_counter()
+        try:
+            for src, dump_path in zip(srcs, dump_paths):
+                if src in stale:
+                    results[src] = convert_header(src, dump_path, options,
+                                                  tu_cache)
+                    stale.discard(src)
+            written = write_converted(
+                dst, merge_converted(results[src] for src in srcs))
+        except Exception as e:
+            # Most likely a header saved halfway. Headers that were not
+            # converted stay stale and are retried on the next change.
+            print('error: %s: %s' % (type(e).__name__, e))
+        else:
+            print('%s %s in %.0f ms' % (
+                'wrote' if written else 'unchanged', dst,
+                (time.perf_counter() - start) * 1000))
+        stale |= wait_for_changes(tu_cache, srcs, interval)
+
+
+def main():
     parser = argparse.ArgumentParser(
-        description='Convert C++ header file to rust source file.')
+        description='Convert C++ header files to a rust source file.')
 
-    parser.add_argument('src', help='C++ header file path.')
+    parser.add_argument('src', nargs='+', help='C++ header file paths.')
     parser.add_argument('dst', help='Output file path.')
     parser.add_argument('--CLANG_LIBRARY_PATH', help='Clang library path.')
     parser.add_argument('-i', '--include', action='store_true',
                         help='Include included file')
+    parser.add_argument('--allow', action='append', default=[],
+                        help='Also convert declarations from this included '
+                        'file. May be repeated.')
+    parser.add_argument('--dump', action='store_true',
+                        help='Also write the AST to dst.txt for debugging.')
+    parser.add_argument('--clang-arg', action='append', dest='clang_args',
+                        default=[],
+                        help='Argument passed to clang. May be repeated.')
+    parser.add_argument('--cache-dir', default=default_cache_dir(),
+                        help='Parsed translation unit cache path.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always parse the header.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes.')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and regenerate whenever a header '
+                        'or one of its includes changes. Edits to the header '
+                        'alone reuse a precompiled preamble of its includes, '
+                        'which one-shot runs never do.')
+    parser.add_argument('--watch-interval', type=float, default=0.2,
+                        help='Seconds between checks for changes.')
 
     args = parser.parse_args()
 
-    print('src='+args.src)
+    print('src='+', '.join(args.src))
     print('dst='+args.dst)
     print('CLANG_LIBRARY_PATH='+str(args.CLANG_LIBRARY_PATH))
     print('include='+str(args.include))
 
-    source_file_path = args.src
-    is_including_other_file = args.include
-
-    if args.CLANG_LIBRARY_PATH:
-        Config.set_library_path(args.CLANG_LIBRARY_PATH)
-    else:
-        CLANG_LIBRARY_PATH = 'CLANG_LIBRARY_PATH'
-        if CLANG_LIBRARY_PATH in os.environ:
-            clang_library_path = os.environ[CLANG_LIBRARY_PATH]
-            Config.set_library_path(clang_library_path)
-
-    index = Index.create()
-
-    tu = index.parse(args.src,
-                     options=TranslationUnit.PARSE_SKIP_FUNCTION_BODIES)
-
-    file_test = open(args.dst+'.txt', 'w')
-    dump(tu.cursor, file_test)
-    file_test.close()
-
-    converted = convert(tu.cursor, Converted())
-    file = open(args.dst, 'w')
-    file.writelines(converted.enums)
-    file.writelines(converted.unions)
-    file.writelines(converted.structs)
-    file.writelines(converted.functions)
-    file.close()
+    options = Options(args.clang_args,
+                      None if args.no_cache else args.cache_dir,
+                      args.include, args.allow, args.CLANG_LIBRARY_PATH)
+
+    dump_paths = [None] * len(args.src)
+    if args.dump and len(args.src) == 1:
+        dump_paths = [args.dst + '.txt']
+    elif args.dump:
+        dump_paths = [args.dst + '.' + os.path.basename(src) + '.txt'
+                      for src in args.src]
+
+    if args.watch:
+        try:
+            watch_headers(args.src, args.dst, dump_paths, options,
+                          args.watch_interval)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    converted = convert_headers(args.src, dump_paths, options, args.jobs)
+    write_converted(args.dst, converted)
 
 
 if __name__ == '__main__':
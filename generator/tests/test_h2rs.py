@@ -0,0 +1,177 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'h2rs'))
+
+try:
+    from h2rs import *
+    setup_clang()
+    Index.create()
+    has_libclang = True
+except Exception:
+    # Either the clang bindings or the libclang library are missing.
+    has_libclang = False
+
+
+def write_file(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+@unittest.skipUnless(has_libclang, 'libclang is not available')
+class TestH2rs(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def parse(self, src, clang_args=None):
+        return Index.create().parse(src, args=clang_args,
+                                    options=PARSE_OPTIONS)
+
+    def struct_fields(self, tu, name):
+        for node in tu.cursor.get_children():
+            if node.kind.name == 'STRUCT_DECL' and node.spelling == name:
+                return dict((child.spelling, child.type)
+                            for child in node.get_children())
+        self.fail('No struct ' + name)
+
+    def test_converted_defaults(self):
+        first = Converted()
+        first.structs.append(Declaration('c:@S@A', 'a.h', ''))
+        self.assertEqual(Converted().structs, [])
+        self.assertIsNot(Converted().enums, Converted().enums)
+
+    def test_merge_converted(self):
+        first = Converted(structs=[Declaration('c:@S@A', 'a.h', 'A\n'),
+                                   Declaration('c:@S@B', 'a.h', 'B\n')])
+        second = Converted(enums=[Declaration('c:@E@E', 'b.h', 'E\n')],
+                           structs=[Declaration('c:@S@A', 'b.h', 'A2\n')])
+        merged = merge_converted([first, second])
+        self.assertEqual([d.rs for d in merged.structs], ['A\n', 'B\n'])
+        self.assertEqual([d.header for d in merged.enums], ['b.h'])
+        self.assertEqual(first.structs[0].rs, 'A\n')
+
+    def test_write_converted(self):
+        path = self.path('out.rs')
+        converted = Converted(
+            enums=[Declaration('c:@E@E', 'a.h', 'enum E {}\n')],
+            structs=[Declaration('c:@S@S', 'a.h', 'struct S {}\n')])
+        self.assertTrue(write_converted(path, converted))
+        with open(path) as f:
+            self.assertEqual(f.read(), '// a.h\nenum E {}\n'
+                             '// a.h\nstruct S {}\n')
+
+        os.utime(path, (1, 1))
+        self.assertFalse(write_converted(path, converted))
+        self.assertEqual(os.stat(path).st_mtime, 1)
+
+        converted.structs.clear()
+        self.assertTrue(write_converted(path, converted))
+        self.assertNotEqual(os.stat(path).st_mtime, 1)
+
+    def test_source_digests(self):
+        dep = write_file(self.path('dep.h'), 'typedef int dep_t;\n')
+        src = write_file(self.path('test.h'), '#include "dep.h"\n')
+        self.assertIsNone(file_digest(self.path('missing.h')))
+
+        digests = source_digests(self.parse(src), src)
+        self.assertEqual(sorted(digests), [dep, src])
+        self.assertTrue(is_up_to_date(digests))
+        write_file(dep, 'typedef long dep_t;\n')
+        self.assertFalse(is_up_to_date(digests))
+
+    def test_tu_cache(self):
+        dep = write_file(self.path('dep.h'), 'typedef int dep_t;\n')
+        src = write_file(self.path('test.h'),
+                         '#include "dep.h"\nstruct S { dep_t a; };\n')
+        cache_dir = self.path('cache')
+        path = tu_cache_path(src, [], cache_dir)
+        self.assertEqual(path, tu_cache_path(src, [], cache_dir))
+        self.assertNotEqual(path, tu_cache_path(src, ['-DX'], cache_dir))
+
+        index = Index.create()
+        self.assertIsNone(read_tu_cache(index, path, src, []))
+        tu = self.parse(src)
+        write_tu_cache(tu, path, src, [], source_digests(tu, src))
+        self.assertEqual(os.listdir(cache_dir).count(
+            os.path.basename(path) + '.json'), 1)
+
+        cached = read_tu_cache(index, path, src, [])
+        self.assertIsNotNone(cached)
+        self.assertEqual(sorted(cached[1]), [dep, src])
+        self.assertIsNone(read_tu_cache(index, path, src, ['-DX']))
+        self.assertIsNone(read_tu_cache(index, path, dep, []))
+
+        write_file(dep, 'typedef long dep_t;\n')
+        self.assertIsNone(read_tu_cache(index, path, src, []))
+
+    def test_walk(self):
+        dep = write_file(self.path('dep.h'), 'struct Dep { int a; };\n')
+        src = write_file(self.path('test.h'),
+                         '#include "dep.h"\nstruct S { int b; };\n')
+        tu = self.parse(src)
+        visited = [node.spelling for node, depth in
+                   walk(tu.cursor, FileFilter([src]), lambda node: True)]
+        self.assertIn('S', visited)
+        self.assertIn('b', visited)
+        self.assertNotIn('Dep', visited)
+        self.assertNotIn('a', visited)
+
+        visited = [(node.spelling, depth) for node, depth in
+                   walk(tu.cursor, FileFilter([src, dep]), is_container)]
+        self.assertIn(('Dep', 1), visited)
+        self.assertNotIn(('a', 2), visited)
+
+    def test_convert_type(self):
+        src = write_file(self.path('test.h'), '''\
+struct S {
+    int **pointers;
+    const char *const *names;
+    float matrix[2][3];
+    unsigned short count;
+    void (*callback)(int, const char *);
+    int (*getter)(void);
+};
+''')
+        fields = self.struct_fields(self.parse(src), 'S')
+        self.assertEqual(convert_type(fields['pointers']), '*mut *mut c_int')
+        self.assertEqual(convert_type(fields['names']),
+                         '*const *const c_char')
+        self.assertEqual(convert_type(fields['matrix']),
+                         '[[c_float; 3]; 2]')
+        self.assertEqual(convert_type(fields['count']), 'c_ushort')
+        self.assertEqual(convert_type(fields['callback']),
+                         'Option<unsafe extern "C" fn(c_int, *const c_char)>')
+        self.assertEqual(convert_type(fields['getter']),
+                         'Option<unsafe extern "C" fn() -> c_int>')
+
+    def test_convert_header(self):
+        write_file(self.path('dep.h'), 'struct Dep { int a; };\n')
+        src = write_file(self.path('test.h'), '''\
+#include "dep.h"
+struct Later;
+struct User { struct Later *later; };
+struct Later { int b; };
+''')
+        converted = convert_header(src, None, Options())
+        self.assertEqual([d.rs.split('\n')[1] for d in converted.structs],
+                         ['struct User {', 'struct Later {'])
+        self.assertEqual(set(d.header for d in converted.structs),
+                         set(['test.h']))
+
+        options = Options(include=True)
+        with_dep = convert_header(src, None, options)
+        self.assertEqual([d.header for d in with_dep.structs],
+                         ['dep.h', 'test.h', 'test.h'])
+        merged = merge_converted([converted, with_dep])
+        self.assertEqual(len(merged.structs), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
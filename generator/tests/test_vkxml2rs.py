@@ -2,12 +2,171 @@ import unittest
 import os
 import pprint
 import dataclasses
+import tempfile
+import io
+import contextlib
+import pickle
+from unittest import mock
 
 import xml.etree.ElementTree as ET
 # from vkxml2rs.elements import *
 # from vkxml2rs.parse import *
 from vkxml2rs import *
 from modules.parse import *
+from modules.symbols import *
+from modules import cache
+from modules.output import *
+from modules.render import *
+from modules.filter import *
+from modules.graph import *
+from modules.emit import *
+from modules.watch import *
+from modules.stamp import *
+from modules.dispatch import *
+from modules.chain import *
+from modules.names import *
+from modules.registry import *
+from modules import registry as registry_module
+from modules import stamp
+from modules.profile import *
+
+
+
+# The model only holds TypeRefs; tests spell types as C declarations.
+def param(c_decl, name, *args):
+    return Param(type_ref(c_decl), name, *args)
+
+
+def member(name, c_decl, *args):
+    return Member(name, type_ref(c_decl), *args)
+
+
+def command(name, return_type, params):
+    return Command(name, type_ref(return_type), params)
+
+
+def funcpointer(name, return_type, params):
+    return FuncPointer(name, type_ref(return_type), params)
+
+
+REGISTRY_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<registry>\n'
+    '    <comment>Mini registry</comment>\n'
+    '    <types comment="Vulkan type definitions">\n'
+    '        <type category="include" name="vk_platform">#include "vk_platform.h"</type>\n'
+    '        <type category="basetype">typedef <type>uint32_t</type> <name>VkFlags</name>;</type>\n'
+    '        <type category="basetype">typedef <type>uint32_t</type> <name>VkBool32</name>;</type>\n'
+    '        <type category="basetype">struct <name>ANativeWindow</name>;</type>\n'
+    '        <type requires="VkQueueFlagBits" category="bitmask">typedef <type>VkFlags</type> <name>VkQueueFlags</name>;</type>\n'
+    '        <type category="handle"><type>VK_DEFINE_HANDLE</type>(<name>VkInstance</name>)</type>\n'
+    '        <type category="handle" parent="VkInstance"><type>VK_DEFINE_HANDLE</type>(<name>VkPhysicalDevice</name>)</type>\n'
+    '        <type category="handle" parent="VkPhysicalDevice"><type>VK_DEFINE_HANDLE</type>(<name>VkDevice</name>)</type>\n'
+    '        <type category="handle" parent="VkDevice"><type>VK_DEFINE_NON_DISPATCHABLE_HANDLE</type>(<name>VkSwapchainKHR</name>)</type>\n'
+    '        <type category="enum" name="VkStructureType"/>\n'
+    '        <type category="enum" name="VkQueueFlagBits"/>\n'
+    '        <type category="enum" name="VkPointClippingBehavior"/>\n'
+    '        <type category="enum" name="VkPointClippingBehaviorKHR" alias="VkPointClippingBehavior"/>\n'
+    '        <type category="funcpointer">typedef void (VKAPI_PTR *<name>PFN_vkVoidFunction</name>)(void);</type>\n'
+    '        <type category="struct" name="VkApplicationInfo">\n'
+    '            <member values="VK_STRUCTURE_TYPE_APPLICATION_INFO"><type>VkStructureType</type> <name>sType</name></member>\n'
+    '            <member>const <type>void</type>*     <name>pNext</name></member>\n'
+    '            <member optional="true" len="null-terminated">const <type>char</type>*     <name>pApplicationName</name></member>\n'
+    '            <member><type>uint32_t</type>        <name>apiVersion</name></member>\n'
+    '        </type>\n'
+    '        <type category="union" name="VkClearColorValue" comment="// Union allowing specification of floating point, integer, or unsigned integer color data. Actual value selected is based on image/attachment being cleared.">\n'
+    '            <member><type>float</type>                  <name>float32</name>[4]</member>\n'
+    '            <member><type>int32_t</type>                <name>int32</name>[4]</member>\n'
+    '        </type>\n'
+    '    </types>\n'
+    '    <enums name="API Constants" comment="Vulkan hardcoded constants">\n'
+    '        <enum value="256"       name="VK_MAX_PHYSICAL_DEVICE_NAME_SIZE"/>\n'
+    '    </enums>\n'
+    '    <enums name="VkStructureType" type="enum">\n'
+    '        <enum value="0"     name="VK_STRUCTURE_TYPE_APPLICATION_INFO"/>\n'
+    '        <enum value="1"     name="VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO"/>\n'
+    '        <comment>Values 2 and 3 are reserved</comment>\n'
+    '    </enums>\n'
+    '    <enums name="VkQueueFlagBits" type="bitmask">\n'
+    '        <enum bitpos="0"    name="VK_QUEUE_GRAPHICS_BIT"/>\n'
+    '        <enum bitpos="1"    name="VK_QUEUE_COMPUTE_BIT"/>\n'
+    '    </enums>\n'
+    '    <enums name="VkResult" type="enum">\n'
+    '        <enum value="0"     name="VK_SUCCESS"/>\n'
+    '        <enum value="-1"    name="VK_ERROR_OUT_OF_HOST_MEMORY"/>\n'
+    '    </enums>\n'
+    '    <enums name="VkPointClippingBehavior" type="enum">\n'
+    '        <enum name="VK_POINT_CLIPPING_BEHAVIOR_ALL_CLIP_PLANES_KHR" alias="VK_POINT_CLIPPING_BEHAVIOR_ALL_CLIP_PLANES"/>\n'
+    '        <enum value="0"     name="VK_POINT_CLIPPING_BEHAVIOR_ALL_CLIP_PLANES"/>\n'
+    '        <enum name="VK_POINT_CLIPPING_BEHAVIOR_GRAPHICS_KHR" alias="VK_QUEUE_GRAPHICS_BIT"/>\n'
+    '    </enums>\n'
+    '    <commands comment="Vulkan command definitions">\n'
+    '        <command successcodes="VK_SUCCESS" errorcodes="VK_ERROR_OUT_OF_HOST_MEMORY">\n'
+    '            <proto><type>VkResult</type> <name>vkEnumeratePhysicalDevices</name></proto>\n'
+    '            <param><type>VkInstance</type> <name>instance</name></param>\n'
+    '            <param optional="false,true"><type>uint32_t</type>* <name>pPhysicalDeviceCount</name></param>\n'
+    '            <param optional="true" len="pPhysicalDeviceCount"><type>VkPhysicalDevice</type>* <name>pPhysicalDevices</name></param>\n'
+    '        </command>\n'
+    '        <command>\n'
+    '            <proto><type>PFN_vkVoidFunction</type> <name>vkGetDeviceProcAddr</name></proto>\n'
+    '            <param><type>VkDevice</type> <name>device</name></param>\n'
+    '            <param len="null-terminated">const <type>char</type>* <name>pName</name></param>\n'
+    '        </command>\n'
+    '        <command name="vkEnumeratePhysicalDevicesKHR" alias="vkEnumeratePhysicalDevices"/>\n'
+    '    </commands>\n'
+    '    <feature api="vulkan" name="VK_VERSION_1_0" number="1.0" comment="Vulkan core API interface definitions">\n'
+    '        <require comment="Header boilerplate">\n'
+    '            <type name="vk_platform"/>\n'
+    '        </require>\n'
+    '        <require comment="Device initialization">\n'
+    '            <type name="VkApplicationInfo"/>\n'
+    '            <command name="vkEnumeratePhysicalDevices"/>\n'
+    '            <command name="vkGetDeviceProcAddr"/>\n'
+    '        </require>\n'
+    '    </feature>\n'
+    '    <feature api="vulkan" name="VK_VERSION_1_1" number="1.1" comment="Vulkan 1.1 core API interface definitions.">\n'
+    '        <require comment="Promoted from VK_KHR_subgroup">\n'
+    '            <enum extends="VkStructureType" extnumber="95" offset="0" name="VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_SUBGROUP_PROPERTIES"/>\n'
+    '            <enum bitpos="4" extends="VkQueueFlagBits" name="VK_QUEUE_PROTECTED_BIT"/>\n'
+    '            <type name="VkPointClippingBehavior"/>\n'
+    '        </require>\n'
+    '    </feature>\n'
+    '    <extensions comment="Vulkan extension interface definitions">\n'
+    '        <extension name="VK_KHR_surface" number="1" type="instance" supported="vulkan">\n'
+    '            <require>\n'
+    '                <enum value="25" name="VK_KHR_SURFACE_SPEC_VERSION"/>\n'
+    '                <enum offset="0" dir="-" extends="VkResult" name="VK_ERROR_SURFACE_LOST_KHR"/>\n'
+    '            </require>\n'
+    '        </extension>\n'
+    '        <extension name="VK_KHR_swapchain" number="2" type="device" requires="VK_KHR_surface" supported="vulkan">\n'
+    '            <require>\n'
+    '                <enum offset="0" extends="VkStructureType" name="VK_STRUCTURE_TYPE_SWAPCHAIN_CREATE_INFO_KHR"/>\n'
+    '                <enum offset="4" extends="VkResult" dir="-" name="VK_ERROR_OUT_OF_DATE_KHR"/>\n'
+    '                <type name="VkSwapchainKHR"/>\n'
+    '            </require>\n'
+    '        </extension>\n'
+    '        <extension name="VK_KHR_subgroup" number="95" type="device" supported="disabled">\n'
+    '            <require>\n'
+    '                <enum offset="1" extends="VkStructureType" name="VK_STRUCTURE_TYPE_RESERVED_95_KHR"/>\n'
+    '            </require>\n'
+    '        </extension>\n'
+    '        <extension name="VK_KHR_maintenance2" number="118" type="device" supported="vulkan">\n'
+    '            <require>\n'
+    '                <enum extends="VkStructureType" name="VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_SUBGROUP_PROPERTIES_KHR" alias="VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_SUBGROUP_PROPERTIES"/>\n'
+    '                <enum extends="VkStructureType" extnumber="95" offset="0" name="VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_SUBGROUP_PROPERTIES"/>\n'
+    '                <enum value="0x00000100" extends="VkQueueFlagBits" name="VK_QUEUE_RESERVED_8_BIT_KHR"/>\n'
+    '            </require>\n'
+    '        </extension>\n'
+    '    </extensions>\n'
+    '</registry>\n'
+)
+
+
+def write_registry(directory, xml=REGISTRY_XML):
+    xml_path = os.path.join(directory, 'vk.xml')
+    with open(xml_path, 'w') as f:
+        f.write(xml)
+    return xml_path
 
 
 class TestConverter(unittest.TestCase):
@@ -22,7 +181,7 @@ class TestConverter(unittest.TestCase):
             '</types>'
         )
         root = ET.fromstring(xml)
-        children = root.getchildren()
+        children = list(root)
         basetypes = []
         for child in children:
             basetypes.append(parse_basetype(child))
@@ -41,13 +200,13 @@ class TestConverter(unittest.TestCase):
             '</types>'
         )
         root = ET.fromstring(xml)
-        children = root.getchildren()
+        children = list(root)
         handles = []
         for child in children:
             handles.append(parse_handle(child))
 
         self.assertEqual(handles[0], Handle('VkInstance'))
-        self.assertEqual(handles[1], Handle('VkPhysicalDevice'))
+        self.assertEqual(handles[1], Handle('VkPhysicalDevice', 'VkInstance'))
 
     def test_parse_funcpointer(self):
         xml = (
@@ -69,38 +228,38 @@ class TestConverter(unittest.TestCase):
             '</types>\n'
         )
         root = ET.fromstring(xml)
-        children = root.getchildren()
+        children = list(root)
         funcpointers = []
         for child in children:
             funcpointers.append(parse_funcpointer(child))
 
         self.assertEqual(
             funcpointers[0],
-            FuncPointer(
+            funcpointer(
                 'PFN_vkDebugReportCallbackEXT',
                 'VkBool32',
                 [
-                    Param('VkDebugReportFlagsEXT', 'flags'),
-                    Param('VkDebugReportObjectTypeEXT', 'objectType'),
-                    Param('uint64_t', 'object'),
-                    Param('size_t', 'location'),
-                    Param('int32_t', 'messageCode'),
-                    Param('const char *', 'pLayerPrefix'),
-                    Param('const char *', 'pMessage'),
-                    Param('void *', 'pUserData'),
+                    param('VkDebugReportFlagsEXT', 'flags'),
+                    param('VkDebugReportObjectTypeEXT', 'objectType'),
+                    param('uint64_t', 'object'),
+                    param('size_t', 'location'),
+                    param('int32_t', 'messageCode'),
+                    param('const char *', 'pLayerPrefix'),
+                    param('const char *', 'pMessage'),
+                    param('void *', 'pUserData'),
                 ]))
         self.assertEqual(
             funcpointers[1],
-            FuncPointer(
+            funcpointer(
                 'PFN_vkDebugUtilsMessengerCallbackEXT',
                 'VkBool32',
                 [
-                    Param('VkDebugUtilsMessageSeverityFlagBitsEXT',
+                    param('VkDebugUtilsMessageSeverityFlagBitsEXT',
                           'messageSeverity'),
-                    Param('VkDebugUtilsMessageTypeFlagsEXT', 'messageTypes'),
-                    Param('const VkDebugUtilsMessengerCallbackDataEXT *',
+                    param('VkDebugUtilsMessageTypeFlagsEXT', 'messageTypes'),
+                    param('const VkDebugUtilsMessengerCallbackDataEXT *',
                           'pCallbackData'),
-                    Param('void *', 'pUserData'),
+                    param('void *', 'pUserData'),
                 ]))
 
     def test_parse_enums(self):
@@ -121,10 +280,15 @@ class TestConverter(unittest.TestCase):
             '        <enum bitpos="2"    name="VK_QUEUE_TRANSFER_BIT"                             comment="Queue supports transfer operations"/>\n'
             '        <enum bitpos="3"    name="VK_QUEUE_SPARSE_BINDING_BIT"                       comment="Queue supports sparse resource memory management operations"/>\n'
             '    </enums>\n'
+            '    <enums name="VkPipelineStageFlagBits2" type="bitmask" bitwidth="64">\n'
+            '        <enum value="0ULL"  name="VK_PIPELINE_STAGE_2_NONE"/>\n'
+            '        <enum bitpos="0"    name="VK_PIPELINE_STAGE_2_TOP_OF_PIPE_BIT"/>\n'
+            '        <enum value="0x10UL" name="VK_PIPELINE_STAGE_2_RESERVED_4_BIT"/>\n'
+            '    </enums>\n'
             '</registry>\n'
         )
         root = ET.fromstring(xml)
-        children = root.getchildren()
+        children = list(root)
         enums = []
         for child in children:
             if child.tag == 'enums':
@@ -134,16 +298,28 @@ class TestConverter(unittest.TestCase):
             Enum('VK_PERFORMANCE_COUNTER_SCOPE_COMMAND_BUFFER_KHR', 0),
             Enum('VK_PERFORMANCE_COUNTER_SCOPE_RENDER_PASS_KHR', 1),
             Enum('VK_PERFORMANCE_COUNTER_SCOPE_COMMAND_KHR', 2),
-            Enum('VK_QUERY_SCOPE_COMMAND_BUFFER_KHR', 0),
-            Enum('VK_QUERY_SCOPE_RENDER_PASS_KHR', 1),
-            Enum('VK_QUERY_SCOPE_COMMAND_KHR', 2),
+            Enum('VK_QUERY_SCOPE_COMMAND_BUFFER_KHR', 0,
+                 'VK_PERFORMANCE_COUNTER_SCOPE_COMMAND_BUFFER_KHR'),
+            Enum('VK_QUERY_SCOPE_RENDER_PASS_KHR', 1,
+                 'VK_PERFORMANCE_COUNTER_SCOPE_RENDER_PASS_KHR'),
+            Enum('VK_QUERY_SCOPE_COMMAND_KHR', 2,
+                 'VK_PERFORMANCE_COUNTER_SCOPE_COMMAND_KHR'),
         ]))
         self.assertEqual(enums[1], Enums('VkQueueFlagBits', [
             Enum('VK_QUEUE_GRAPHICS_BIT', 1),
             Enum('VK_QUEUE_COMPUTE_BIT', 2),
             Enum('VK_QUEUE_TRANSFER_BIT', 4),
             Enum('VK_QUEUE_SPARSE_BINDING_BIT', 8),
-        ]))
+        ], True))
+        self.assertEqual(enums[2], Enums('VkPipelineStageFlagBits2', [
+            Enum('VK_PIPELINE_STAGE_2_NONE', 0),
+            Enum('VK_PIPELINE_STAGE_2_TOP_OF_PIPE_BIT', 1),
+            Enum('VK_PIPELINE_STAGE_2_RESERVED_4_BIT', 16),
+        ], True, 64))
+        self.assertIn('pub struct VkPipelineStageFlagBits2(pub u64);\n',
+                      enums[2].to_rs())
+        self.assertIn('pub struct VkQueueFlagBits(pub u32);\n',
+                      enums[1].to_rs())
 
     def test_parse_struct(self):
         xml = (
@@ -160,21 +336,1001 @@ class TestConverter(unittest.TestCase):
             '</registry>\n'
         )
         root = ET.fromstring(xml)
-        children = root.getchildren()
+        children = list(root)
         structs = []
         for child in children:
             if child.tag == 'type' and child.attrib['category'] == 'struct':
                 structs.append(parse_struct(child))
 
         self.assertEqual(structs[0], Struct('VkApplicationInfo', [
-            Member('sType', 'VkStructureType'),
-            Member('pNext', 'const void *'),
-            Member('pApplicationName', 'const char *'),
-            Member('applicationVersion', 'uint32_t'),
-            Member('pEngineName', 'const char *'),
-            Member('engineVersion', 'uint32_t'),
-            Member('apiVersion', 'uint32_t'),
+            member('sType', 'VkStructureType'),
+            member('pNext', 'const void *'),
+            member('pApplicationName', 'const char *',
+                   'null-terminated', (True,)),
+            member('applicationVersion', 'uint32_t'),
+            member('pEngineName', 'const char *',
+                   'null-terminated', (True,)),
+            member('engineVersion', 'uint32_t'),
+            member('apiVersion', 'uint32_t'),
+        ], 'VK_STRUCTURE_TYPE_APPLICATION_INFO'))
+
+    def test_array_params(self):
+        command = parse_command(ET.fromstring(
+            '<command>\n'
+            '    <proto><type>void</type> <name>vkCmdSetBlendConstants</name></proto>\n'
+            '    <param><type>VkCommandBuffer</type> <name>commandBuffer</name></param>\n'
+            '    <param>const <type>float</type> <name>blendConstants</name>[4]</param>\n'
+            '</command>\n'), Elements())
+        self.assertIs(command.return_type, type_ref('void'))
+        self.assertIs(command.params[1].type_, type_ref('const float[4]'))
+        self.assertEqual(
+            command.to_rs(),
+            'extern "system" {\n'
+            '    pub fn vkCmdSetBlendConstants(commandBuffer: VkCommandBuffer, '
+            'blendConstants: *const f32);\n'
+            '}\n')
+        self.assertIs(type_ref('float[3][4]').decayed(), type_ref('float *'))
+
+        # Members keep their arrays by value.
+        self.assertEqual(
+            Struct('VkBlend', [member('constants', 'float[4]')]).to_rs(),
+            '#[repr(C)]\n'
+            '#[derive(Copy, Clone)]\n'
+            'pub struct VkBlend {\n'
+            '    pub constants: [f32; 4],\n'
+            '}\n')
+
+        funcpointer = parse_funcpointer(ET.fromstring(
+            '<type category="funcpointer">typedef void* (VKAPI_PTR *<name>PFN_vkAllocationFunction</name>)(\n'
+            '    <type>void</type>*                                       pUserData,\n'
+            '    <type>size_t</type>                                      size);</type>\n'))
+        self.assertIs(funcpointer.return_type, type_ref('void *'))
+        self.assertEqual(
+            funcpointer.to_rs(),
+            'pub type PFN_vkAllocationFunction = Option<unsafe extern '
+            '"system" fn(pUserData: *mut c_void, size: usize) '
+            '-> *mut c_void>;\n')
+
+    def test_type_ref(self):
+        xml = (
+            '<type category="struct" name="VkPhysicalDeviceProperties">\n'
+            '    <member>const <type>char</type>* const*      <name>ppEnabledLayerNames</name></member>\n'
+            '    <member><type>char</type>              <name>deviceName</name>[<enum>VK_MAX_PHYSICAL_DEVICE_NAME_SIZE</enum>]</member>\n'
+            '    <member><type>float</type>             <name>matrix</name>[3][4]</member>\n'
+            '</type>\n'
+        )
+        struct = parse_struct(ET.fromstring(xml))
+        names = struct.members[0].type_
+        self.assertIs(names, type_ref('const char **'))
+        self.assertEqual(names.rs(), '*const *const c_char')
+        self.assertEqual(struct.members[1].type_,
+                         TypeRef('char', array=(
+                             'VK_MAX_PHYSICAL_DEVICE_NAME_SIZE',)))
+        self.assertEqual(struct.members[1].type_.rs(),
+                         '[c_char; VK_MAX_PHYSICAL_DEVICE_NAME_SIZE as usize]')
+        self.assertIs(struct.members[2].type_, type_ref('float[3][4]'))
+        self.assertEqual(struct.members[2].type_.rs(), '[[f32; 4]; 3]')
+        self.assertIs(pickle.loads(pickle.dumps(names)), names)
+        self.assertEqual(Constant('VK_REMAINING_MIP_LEVELS', '(~0U)').to_rs(),
+                         'pub const VK_REMAINING_MIP_LEVELS: u32 = !0;\n')
+        self.assertEqual(Constant('VK_QUEUE_FAMILY_EXTERNAL', '(~0U-1)').to_rs(),
+                         'pub const VK_QUEUE_FAMILY_EXTERNAL: u32 = !0 - 1;\n')
+
+    def test_constant_types(self):
+        constants = parse_constants(ET.fromstring(
+            '<enums name="API Constants">\n'
+            '    <enum type="uint32_t" value="256" name="VK_MAX_PHYSICAL_DEVICE_NAME_SIZE"/>\n'
+            '    <enum type="float" value="1000.0F" name="VK_LOD_CLAMP_NONE"/>\n'
+            '    <enum type="uint64_t" value="(~0ULL)" name="VK_WHOLE_SIZE"/>\n'
+            '    <enum type="uint32_t" value="(~1U)" name="VK_QUEUE_FAMILY_EXTERNAL"/>\n'
+            '    <enum type="uint32_t" value="(~2U)" name="VK_QUEUE_FAMILY_FOREIGN_EXT"/>\n'
+            '    <enum value="(~0U-1)" name="VK_QUEUE_FAMILY_EXTERNAL_KHR"/>\n'
+            '    <enum type="uint32_t" value="1" name="VK_TRUE"/>\n'
+            '    <enum value="16" name="VK_UUID_SIZE"/>\n'
+            '    <enum name="VK_MAX_DEVICE_NAME_SIZE" alias="VK_MAX_PHYSICAL_DEVICE_NAME_SIZE"/>\n'
+            '</enums>\n'))
+        self.assertEqual([c.to_rs() for c in constants], [
+            'pub const VK_MAX_PHYSICAL_DEVICE_NAME_SIZE: u32 = 256;\n',
+            'pub const VK_LOD_CLAMP_NONE: f32 = 1000.0;\n',
+            'pub const VK_WHOLE_SIZE: u64 = !0;\n',
+            'pub const VK_QUEUE_FAMILY_EXTERNAL: u32 = !1;\n',
+            'pub const VK_QUEUE_FAMILY_FOREIGN_EXT: u32 = !2;\n',
+            'pub const VK_QUEUE_FAMILY_EXTERNAL_KHR: u32 = !0 - 1;\n',
+            'pub const VK_TRUE: u32 = 1;\n',
+            'pub const VK_UUID_SIZE: u32 = 16;\n',
+            'pub const VK_MAX_DEVICE_NAME_SIZE: u32 = '
+            'VK_MAX_PHYSICAL_DEVICE_NAME_SIZE;\n',
+        ])
+
+    def test_parse_vk_xml(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            elements = parse_vk_xml(write_registry(tmp))
+
+        self.assertEqual(elements.basetypes, [
+            BaseType('VkFlags', 'uint32_t'),
+            BaseType('VkBool32', 'uint32_t'),
+            BaseType('ANativeWindow', None),
+            BaseType('VkQueueFlags', 'VkFlags', 'VkQueueFlagBits'),
+        ])
+        self.assertEqual(elements.handles, [
+            Handle('VkInstance'),
+            Handle('VkPhysicalDevice', 'VkInstance'),
+            Handle('VkDevice', 'VkPhysicalDevice'),
+            Handle('VkSwapchainKHR', 'VkDevice'),
+        ])
+        self.assertEqual(elements.functionpointers, [
+            funcpointer('PFN_vkVoidFunction', 'void', []),
+        ])
+        self.assertEqual(elements.enums, [
+            Enums('VkStructureType', [
+                Enum('VK_STRUCTURE_TYPE_APPLICATION_INFO', 0),
+                Enum('VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO', 1),
+                Enum('VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_SUBGROUP_PROPERTIES',
+                     1000094000),
+                Enum('VK_STRUCTURE_TYPE_SWAPCHAIN_CREATE_INFO_KHR',
+                     1000001000),
+                Enum('VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_SUBGROUP_PROPERTIES_KHR',
+                     1000094000,
+                     'VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_SUBGROUP_PROPERTIES'),
+            ]),
+            Enums('VkQueueFlagBits', [
+                Enum('VK_QUEUE_GRAPHICS_BIT', 1),
+                Enum('VK_QUEUE_COMPUTE_BIT', 2),
+                Enum('VK_QUEUE_PROTECTED_BIT', 16),
+                Enum('VK_QUEUE_RESERVED_8_BIT_KHR', 256),
+            ], True),
+            Enums('VkResult', [
+                Enum('VK_SUCCESS', 0),
+                Enum('VK_ERROR_OUT_OF_HOST_MEMORY', -1),
+                Enum('VK_ERROR_SURFACE_LOST_KHR', -1000000000),
+                Enum('VK_ERROR_OUT_OF_DATE_KHR', -1000001004),
+            ]),
+            Enums('VkPointClippingBehavior', [
+                Enum('VK_POINT_CLIPPING_BEHAVIOR_ALL_CLIP_PLANES_KHR', 0,
+                     'VK_POINT_CLIPPING_BEHAVIOR_ALL_CLIP_PLANES'),
+                Enum('VK_POINT_CLIPPING_BEHAVIOR_ALL_CLIP_PLANES', 0),
+                Enum('VK_POINT_CLIPPING_BEHAVIOR_GRAPHICS_KHR', 1,
+                     'VK_QUEUE_GRAPHICS_BIT'),
+            ]),
+        ])
+        self.assertEqual(elements.features, [
+            Feature('VK_VERSION_1_0', '1.0',
+                    types=['vk_platform', 'VkApplicationInfo'],
+                    commands=['vkEnumeratePhysicalDevices',
+                              'vkGetDeviceProcAddr']),
+            Feature('VK_VERSION_1_1', '1.1',
+                    types=['VkPointClippingBehavior'],
+                    enums=['VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_SUBGROUP_PROPERTIES',
+                           'VK_QUEUE_PROTECTED_BIT']),
+        ])
+        self.assertEqual(
+            [(e.name, e.number, e.supported) for e in elements.extensions],
+            [('VK_KHR_surface', 1, 'vulkan'),
+             ('VK_KHR_swapchain', 2, 'vulkan'),
+             ('VK_KHR_subgroup', 95, 'disabled'),
+             ('VK_KHR_maintenance2', 118, 'vulkan')])
+        self.assertEqual(elements.extensions[0].enums, [
+            'VK_KHR_SURFACE_SPEC_VERSION', 'VK_ERROR_SURFACE_LOST_KHR'])
+        self.assertEqual(elements.aliases, {
+            'VkPointClippingBehaviorKHR': 'VkPointClippingBehavior',
+            'vkEnumeratePhysicalDevicesKHR': 'vkEnumeratePhysicalDevices',
+        })
+        self.assertEqual(elements.structs, [
+            Struct('VkApplicationInfo', [
+                member('sType', 'VkStructureType'),
+                member('pNext', 'const void *'),
+                member('pApplicationName', 'const char *',
+                       'null-terminated', (True,)),
+                member('apiVersion', 'uint32_t'),
+            ], 'VK_STRUCTURE_TYPE_APPLICATION_INFO'),
+        ])
+        self.assertEqual(elements.unions, [
+            Union('VkClearColorValue', [
+                member('float32', 'float[4]'),
+                member('int32', 'int32_t[4]'),
+            ]),
+        ])
+        self.assertEqual(elements.constants, [
+            Constant('VK_MAX_PHYSICAL_DEVICE_NAME_SIZE', '256'),
+        ])
+        self.assertEqual(elements.commands, [
+            command('vkEnumeratePhysicalDevices', 'VkResult', [
+                param('VkInstance', 'instance'),
+                param('uint32_t *', 'pPhysicalDeviceCount', None,
+                      (False, True)),
+                param('VkPhysicalDevice *', 'pPhysicalDevices',
+                      'pPhysicalDeviceCount', (True,)),
+            ]),
+            command('vkGetDeviceProcAddr', 'PFN_vkVoidFunction', [
+                param('VkDevice', 'device'),
+                param('const char *', 'pName', 'null-terminated'),
+            ]),
+        ])
+
+    def test_symbol_index(self):
+        elements = Elements(
+            handles=[Handle('VkInstance')],
+            enums=[
+                Enums('VkFormat', [
+                    Enum('VK_FORMAT_G8B8G8R8_422_UNORM_KHR', None,
+                         'VK_FORMAT_G8B8G8R8_422_UNORM'),
+                    Enum('VK_FORMAT_G8B8G8R8_422_UNORM', 1000156000),
+                ]),
+                Enums('VkResult', [
+                    Enum('VK_ERROR_FRAGMENTATION_EXT', None,
+                         'VK_ERROR_FRAGMENTATION'),
+                ]),
+                Enums('VkResult2', [
+                    Enum('VK_ERROR_FRAGMENTATION', -1000161000),
+                ]),
+            ],
+            aliases={'VkInstanceKHR': 'VkInstance',
+                     'VkInstanceEXT': 'VkInstanceKHR'})
+        index = resolve_aliases(elements)
+
+        self.assertEqual(elements.enums[0].enums[0].value, 1000156000)
+        self.assertEqual(elements.enums[1].enums[0].value, -1000161000)
+        self.assertIs(index['VkInstanceEXT'], elements.handles[0])
+        self.assertIs(index['VkFormat'], elements.enums[0])
+        self.assertIs(index['VK_ERROR_FRAGMENTATION'],
+                      elements.enums[2].enums[0])
+        self.assertNotIn('VkDevice', index)
+
+    def test_load_elements_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_path = write_registry(tmp)
+            cache_dir = os.path.join(tmp, 'cache')
+            elements = cache.load_elements(xml_path, cache_dir)
+            self.assertEqual(elements, parse_vk_xml(xml_path))
+
+            # A warm run must not touch the XML parser at all.
+            with mock.patch.object(cache, 'parse_vk_xml') as parse:
+                self.assertEqual(
+                    cache.load_elements(xml_path, cache_dir), elements)
+                parse.assert_not_called()
+
+            # A corrupt cache is detected and rebuilt.
+            path = cache.cache_path(xml_path, cache_dir)
+            with open(path, 'r+b') as f:
+                f.seek(-8, os.SEEK_END)
+                f.write(b'\0' * 8)
+            with mock.patch.object(cache, 'parse_vk_xml',
+                                   wraps=parse_vk_xml) as parse:
+                self.assertEqual(
+                    cache.load_elements(xml_path, cache_dir), elements)
+                parse.assert_called_once()
+
+            # So is a stale one after vk.xml changed.
+            write_registry(tmp, REGISTRY_XML.replace(
+                'VK_QUEUE_COMPUTE_BIT', 'VK_QUEUE_COMPUTE_BIT_2'))
+            elements = cache.load_elements(xml_path, cache_dir)
+            self.assertEqual(elements.enums[1].enums[1].name,
+                             'VK_QUEUE_COMPUTE_BIT_2')
+            self.assertEqual(os.listdir(cache_dir), [os.path.basename(path)])
+
+    def test_write_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report = write_outputs(tmp, {'a.rs': 'a', 'b/b.rs': 'b'})
+            self.assertEqual(report.added, ['a.rs', 'b/b.rs'])
+            a_path = os.path.join(tmp, 'a.rs')
+            os.utime(a_path, (0, 0))
+
+            report = write_outputs(tmp, {'a.rs': 'a', 'b/b.rs': 'B'})
+            self.assertEqual(report.changed, ['b/b.rs'])
+            self.assertEqual(report.unchanged, ['a.rs'])
+            self.assertEqual(os.path.getmtime(a_path), 0)
+
+            report = write_outputs(tmp, {'b/b.rs': 'B'})
+            self.assertEqual(report.removed, ['a.rs'])
+            self.assertFalse(report.added or report.changed)
+            self.assertFalse(os.path.exists(a_path))
+
+            os.remove(os.path.join(tmp, MANIFEST_NAME))
+            report = write_outputs(tmp, {'b/b.rs': 'B'})
+            self.assertFalse(report.is_modified())
+
+    def test_render_sharded_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            elements = parse_vk_xml(write_registry(tmp))
+        outputs = render_sharded_outputs(elements)
+
+        self.assertEqual(sorted(outputs), [
+            'chain.rs',
+            'commands/mod.rs',
+            'commands/vk_version_1_0.rs',
+            'dispatch.rs',
+            'enums/common.rs',
+            'enums/mod.rs',
+            'enums/vk_version_1_1.rs',
+            'extensions/mod.rs',
+            'extensions/vk_khr_swapchain.rs',
+            'mod.rs',
+            'names.rs',
+            'structs/common.rs',
+            'structs/mod.rs',
+            'structs/vk_version_1_0.rs',
+            'types/common.rs',
+            'types/mod.rs',
+        ])
+        self.assertIn('pub mod extensions;\n', outputs['mod.rs'])
+        self.assertIn('pub use self::extensions::*;\n', outputs['mod.rs'])
+        self.assertIn('pub mod vk_khr_swapchain;\n',
+                      outputs['extensions/mod.rs'])
+        self.assertIn('pub type VkSwapchainKHR',
+                      outputs['extensions/vk_khr_swapchain.rs'])
+        self.assertNotIn('VkSwapchainKHR', outputs['types/common.rs'])
+        self.assertIn('VkApplicationInfo',
+                      outputs['structs/vk_version_1_0.rs'])
+
+    def test_dispatch_tables(self):
+        elements = Elements(
+            handles=[
+                Handle('VkInstance'),
+                Handle('VkPhysicalDevice', 'VkInstance'),
+                Handle('VkDevice', 'VkPhysicalDevice'),
+                Handle('VkCommandPool', 'VkDevice'),
+                Handle('VkCommandBuffer', 'VkCommandPool'),
+            ],
+            commands=[
+                command('vkCreateInstance', 'VkResult', [
+                    param('const VkInstanceCreateInfo *', 'pCreateInfo'),
+                    param('VkInstance *', 'pInstance'),
+                ]),
+                command('vkGetInstanceProcAddr', 'PFN_vkVoidFunction', [
+                    param('VkInstance', 'instance'),
+                    param('const char *', 'pName'),
+                ]),
+                command('vkGetDeviceProcAddr', 'PFN_vkVoidFunction', [
+                    param('VkDevice', 'device'),
+                    param('const char *', 'pName'),
+                ]),
+                command('vkEnumeratePhysicalDevices', 'VkResult', [
+                    param('VkInstance', 'instance'),
+                    param('uint32_t *', 'pPhysicalDeviceCount'),
+                    param('VkPhysicalDevice *', 'pPhysicalDevices'),
+                ]),
+                command('vkTrimCommandPool', 'void', [
+                    param('VkDevice', 'device'),
+                    param('VkCommandPool', 'commandPool'),
+                    param('VkCommandPoolTrimFlags', 'flags'),
+                ]),
+                command('vkCmdDraw', 'void', [
+                    param('VkCommandBuffer', 'commandBuffer'),
+                    param('uint32_t', 'vertexCount'),
+                ]),
+            ],
+            aliases={'vkTrimCommandPoolKHR': 'vkTrimCommandPool'},
+        )
+        levels = CommandLevels(elements)
+        self.assertEqual(
+            [levels.command_level(c) for c in elements.commands],
+            ['global', 'instance', 'instance', 'instance', 'device',
+             'device'])
+
+        tables = dispatch_tables(elements)
+        self.assertEqual(
+            [(t.name, [c.name for c in t.commands]) for t in tables], [
+                ('GlobalDispatch', ['vkCreateInstance']),
+                ('InstanceDispatch', ['vkGetDeviceProcAddr',
+                                      'vkEnumeratePhysicalDevices']),
+                ('DeviceDispatch', ['vkTrimCommandPool', 'vkCmdDraw']),
+            ])
+
+        rs = tables[2].to_rs()
+        self.assertIn('pub vkCmdDraw: Option<unsafe extern "system" fn('
+                      'commandBuffer: VkCommandBuffer, vertexCount: u32)>,\n',
+                      rs)
+        self.assertIn('        device: VkDevice,\n', rs)
+        self.assertIn('vkTrimCommandPool: std::mem::transmute('
+                      'load(b"vkTrimCommandPool\\0")'
+                      '.or_else(|| load(b"vkTrimCommandPoolKHR\\0"))),\n', rs)
+        self.assertIn('get_proc_addr(std::ptr::null_mut(), ',
+                      tables[0].to_rs())
+
+    def test_dispatch_enumerations(self):
+        elements = Elements(
+            handles=[
+                Handle('VkInstance'),
+                Handle('VkPhysicalDevice', 'VkInstance'),
+            ],
+            structs=[
+                Struct('VkQueueFamilyProperties2', [
+                    member('sType', 'VkStructureType'),
+                    member('pNext', 'void *'),
+                ]),
+            ],
+            commands=[
+                command('vkEnumeratePhysicalDevices', 'VkResult', [
+                    param('VkInstance', 'instance'),
+                    param('uint32_t *', 'pPhysicalDeviceCount', None,
+                          (False, True)),
+                    param('VkPhysicalDevice *', 'pPhysicalDevices',
+                          'pPhysicalDeviceCount', (True,)),
+                ]),
+                command('vkGetPhysicalDeviceQueueFamilyProperties2', 'void', [
+                    param('VkPhysicalDevice', 'physicalDevice'),
+                    param('uint32_t *', 'pQueueFamilyPropertyCount', None,
+                          (False, True)),
+                    param('VkQueueFamilyProperties2 *',
+                          'pQueueFamilyProperties',
+                          'pQueueFamilyPropertyCount', (True,)),
+                ]),
+                command('vkDestroyInstance', 'void', [
+                    param('VkInstance', 'instance'),
+                    param('const VkAllocationCallbacks *', 'pAllocator'),
+                ]),
+            ],
+        )
+        table = dispatch_tables(elements)[0]
+        self.assertEqual(
+            [(e.command.name, e.count.name, e.array.name, e.template)
+             for e in table.enumerations], [
+                ('vkEnumeratePhysicalDevices', 'pPhysicalDeviceCount',
+                 'pPhysicalDevices', False),
+                ('vkGetPhysicalDeviceQueueFamilyProperties2',
+                 'pQueueFamilyPropertyCount', 'pQueueFamilyProperties', True),
+            ])
+
+        rs = table.to_rs()
+        self.assertIn('pub unsafe fn enumerate_physical_devices_into_vec('
+                      '&self, instance: VkInstance, '
+                      'out: &mut Vec<VkPhysicalDevice>) -> VkResult {\n', rs)
+        self.assertIn('out.resize(count as usize, std::mem::zeroed());\n',
+                      rs)
+        self.assertIn('if result != VkResult(5) {\n', rs)
+        self.assertIn('pub unsafe fn get_physical_device_queue_family_'
+                      'properties2_into_vec(&self, '
+                      'physicalDevice: VkPhysicalDevice, '
+                      'out: &mut Vec<VkQueueFamilyProperties2>, '
+                      'template: VkQueueFamilyProperties2) {\n', rs)
+        self.assertIn('out: &mut [VkPhysicalDevice]) -> (VkResult, usize) {\n',
+                      rs)
+
+    def test_structure_chains(self):
+        xml = (
+            '<type category="struct" name="VkPhysicalDeviceVulkan11Features" structextends="VkPhysicalDeviceFeatures2,VkDeviceCreateInfo">\n'
+            '    <member values="VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_VULKAN_1_1_FEATURES"><type>VkStructureType</type> <name>sType</name></member>\n'
+            '    <member><type>void</type>*      <name>pNext</name></member>\n'
+            '</type>\n'
+        )
+        struct = parse_struct(ET.fromstring(xml))
+        self.assertEqual(struct.s_type,
+                         'VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_VULKAN_1_1_FEATURES')
+        self.assertEqual(struct.extends,
+                         ['VkPhysicalDeviceFeatures2', 'VkDeviceCreateInfo'])
+
+        elements = Elements(
+            enums=[Enums('VkStructureType', [
+                Enum('VK_STRUCTURE_TYPE_DEVICE_CREATE_INFO', 3),
+                Enum('VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_VULKAN_1_1_FEATURES',
+                     49),
+            ])],
+            structs=[
+                Struct('VkDeviceCreateInfo', [],
+                       'VK_STRUCTURE_TYPE_DEVICE_CREATE_INFO'),
+                struct,
+                Struct('VkOffset2D', []),
+            ],
+        )
+        chains = structure_chains(elements)
+        self.assertEqual(chains[1:], [
+            StructureChain('VkDeviceCreateInfo',
+                           'VK_STRUCTURE_TYPE_DEVICE_CREATE_INFO'),
+            StructureChain(
+                'VkPhysicalDeviceVulkan11Features',
+                'VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_VULKAN_1_1_FEATURES',
+                ['VkDeviceCreateInfo']),
+        ])
+        self.assertIn('pub fn push<N: Extends<T>>', chains[0].to_rs())
+        self.assertEqual(chains[2].to_rs(), (
+            'unsafe impl TaggedStructure for '
+            'VkPhysicalDeviceVulkan11Features {\n'
+            '    const STRUCTURE_TYPE: VkStructureType = '
+            'VK_STRUCTURE_TYPE_PHYSICAL_DEVICE_VULKAN_1_1_FEATURES;\n'
+            '}\n'
+            'unsafe impl Extends<VkDeviceCreateInfo> for '
+            'VkPhysicalDeviceVulkan11Features {}\n'))
+
+        self.assertEqual(structure_chains(Elements()), [])
+
+    def test_enum_name_tables(self):
+        result = Enums('VkResult', [
+            Enum('VK_SUCCESS', 0),
+            Enum('VK_NOT_READY', 1),
+            Enum('VK_ERROR_OUT_OF_HOST_MEMORY', -1),
+            Enum('VK_ERROR_OUT_OF_POOL_MEMORY', -1000069000),
+            Enum('VK_ERROR_OUT_OF_POOL_MEMORY_KHR', -1000069000,
+                 'VK_ERROR_OUT_OF_POOL_MEMORY'),
+        ])
+        self.assertEqual(canonical_names(result), [
+            (-1000069000, 'VK_ERROR_OUT_OF_POOL_MEMORY'),
+            (-1, 'VK_ERROR_OUT_OF_HOST_MEMORY'),
+            (0, 'VK_SUCCESS'),
+            (1, 'VK_NOT_READY'),
+        ])
+
+        names = ['VK_FORMAT_' + str(i) for i in range(300)]
+        seeds, slots = perfect_hash(names)
+        self.assertGreater(len(slots), 300)
+        self.assertEqual(sorted(i for i in slots if i is not None),
+                         list(range(300)))
+        for i, name in enumerate(names):
+            h = fnv1a(name)
+            seed = seeds[fmix(h) % len(seeds)]
+            self.assertEqual(slots[fmix(h ^ seed) % len(slots)], i)
+
+        tables = enum_name_tables(Elements(enums=[
+            result,
+            Enums('VkQueueFlagBits', [
+                Enum('VK_QUEUE_GRAPHICS_BIT', 1),
+                Enum('VK_QUEUE_COMPUTE_BIT', 2),
+            ], True),
+            Enums('VkEmpty', []),
         ]))
+        self.assertEqual([t.name for t in tables],
+                         ['enum_name_hash', 'VkResult', 'VkQueueFlagBits'])
+        self.assertEqual(sorted(tables[1].slots), sorted(
+            (e.name, e.value) for e in result.enums))
+
+        rs = tables[1].to_rs()
+        self.assertIn('static VALUES: [(i32, &str); 4] = [\n'
+                      '            (-1000069000, '
+                      '"VK_ERROR_OUT_OF_POOL_MEMORY"),\n', rs)
+        self.assertIn('        match name {\n'
+                      '            "VK_SUCCESS" => Some(VkResult(0)),\n', rs)
+        self.assertIs(enum_name_tables(Elements(enums=[result]))[1],
+                      tables[1])
+
+        formats = Enums('VkFormat', [Enum(name, i)
+                                     for i, name in enumerate(names)])
+        rs = enum_name_tables(Elements(enums=[formats]))[1].to_rs()
+        self.assertIn('static SLOTS: [(&str, i32); 376] = [\n', rs)
+        self.assertIn('            ("", 0),\n', rs)
+        self.assertIn('Some(VkFormat(value))', rs)
+
+        stages = Enums('VkPipelineStageFlagBits2', [
+            Enum('VK_PIPELINE_STAGE_2_BIT_' + str(i), 1 << (i * 2))
+            for i in range(24)], True, 64)
+        rs = enum_name_tables(Elements(enums=[stages]))[1].to_rs()
+        self.assertIn('static VALUES: [(u64, &str); 24] = [\n', rs)
+        self.assertIn('(70368744177664, "VK_PIPELINE_STAGE_2_BIT_23")', rs)
+        self.assertIn('static SLOTS: [(&str, u64); 31] = [\n', rs)
+        rs = tables[2].to_rs()
+        self.assertIn('static NAMES: [&str; 2] = [\n'
+                      '            "VK_QUEUE_GRAPHICS_BIT",\n'
+                      '            "VK_QUEUE_COMPUTE_BIT",\n'
+                      '        ];\n', rs)
+        self.assertIn('"VK_QUEUE_COMPUTE_BIT" => Some(VkQueueFlagBits(2)),',
+                      rs)
+
+    def test_registry(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_path = write_registry(tmp)
+            cache_dir = os.path.join(tmp, 'cache')
+            elements = parse_vk_xml(xml_path)
+
+            registry = Registry(xml_path, cache_dir)
+            with mock.patch.object(registry_module, 'parse_section',
+                                   wraps=parse_section) as parse:
+                self.assertEqual(registry.struct('VkApplicationInfo'),
+                                 elements.structs[0])
+                self.assertIs(registry.struct('VkApplicationInfo'),
+                              registry.struct('VkApplicationInfo'))
+                self.assertEqual(parse.call_count, 1)
+
+                self.assertEqual(
+                    registry.command('vkEnumeratePhysicalDevicesKHR'),
+                    registry.command('vkEnumeratePhysicalDevices'))
+                self.assertIsNone(registry.struct('VkInstance'))
+                self.assertIsNone(registry.command('vkMissing'))
+                self.assertEqual(registry.handle('VkInstance'),
+                                 Handle('VkInstance'))
+                self.assertEqual(registry.extension('VK_KHR_swapchain'),
+                                 elements.extensions[1])
+                self.assertEqual(registry.feature('VK_VERSION_1_0'),
+                                 elements.features[0])
+            self.assertEqual(registry.enums('VkPointClippingBehaviorKHR'),
+                             elements.enums[3])
+            self.assertEqual(
+                registry.constant('VK_MAX_PHYSICAL_DEVICE_NAME_SIZE'),
+                elements.constants[0])
+            self.assertEqual(registry.load(), elements)
+
+            # With a warm cache nothing is parsed.
+            cache.load_elements(xml_path, cache_dir)
+            with mock.patch.object(registry_module, 'parse_section') as parse:
+                registry = Registry(xml_path, cache_dir)
+                self.assertEqual(registry.struct('VkApplicationInfo'),
+                                 elements.structs[0])
+                self.assertIsNone(registry.union('VkApplicationInfo'))
+                self.assertEqual(registry.enums('VkResult'),
+                                 elements.enums[2])
+                self.assertEqual(registry.extension('VK_KHR_surface'),
+                                 elements.extensions[0])
+                self.assertEqual(registry.feature('VK_VERSION_1_0'),
+                                 elements.features[0])
+                self.assertIsNone(registry.feature('VK_KHR_surface'))
+                self.assertIsNone(registry.extension('VkApplicationInfo'))
+                parse.assert_not_called()
+
+    def test_filter_elements(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            elements = parse_vk_xml(write_registry(tmp))
+
+        filtered = filter_elements(elements, '1.0')
+        self.assertEqual([f.name for f in filtered.features],
+                         ['VK_VERSION_1_0'])
+        self.assertEqual([h.name for h in filtered.handles],
+                         ['VkInstance', 'VkPhysicalDevice', 'VkDevice'])
+        self.assertEqual([f.name for f in filtered.functionpointers],
+                         ['PFN_vkVoidFunction'])
+        self.assertEqual(filtered.enums, [
+            Enums('VkStructureType', [
+                Enum('VK_STRUCTURE_TYPE_APPLICATION_INFO', 0),
+                Enum('VK_STRUCTURE_TYPE_INSTANCE_CREATE_INFO', 1),
+            ]),
+            Enums('VkResult', [
+                Enum('VK_SUCCESS', 0),
+                Enum('VK_ERROR_OUT_OF_HOST_MEMORY', -1),
+            ]),
+        ])
+        self.assertEqual([s.name for s in filtered.structs],
+                         ['VkApplicationInfo'])
+        self.assertEqual(filtered.unions, [])
+        self.assertEqual(filtered.basetypes, [])
+
+        filtered = filter_elements(elements, '1.0', ['VK_KHR_swapchain'])
+        self.assertEqual([h.name for h in filtered.handles],
+                         ['VkInstance', 'VkPhysicalDevice', 'VkDevice',
+                          'VkSwapchainKHR'])
+        self.assertEqual(
+            [e.name for e in filtered.enums[1].enums],
+            ['VK_SUCCESS', 'VK_ERROR_OUT_OF_HOST_MEMORY',
+             'VK_ERROR_OUT_OF_DATE_KHR'])
+
+        self.assertIs(filter_elements(elements), elements)
+        with self.assertRaises(AssertionError):
+            filter_elements(elements, '1.0', ['VK_KHR_unknown'])
+
+    def test_filter_apis(self):
+        xml = REGISTRY_XML.replace('    <extensions comment=', (
+            '    <feature api="vulkansc" name="VKSC_VERSION_1_0" number="1.0">\n'
+            '        <require>\n'
+            '            <enum extends="VkStructureType" extnumber="299" offset="0" name="VK_STRUCTURE_TYPE_SC_ONLY"/>\n'
+            '            <type name="VkClearColorValue"/>\n'
+            '        </require>\n'
+            '    </feature>\n'
+            '    <extensions comment='), 1).replace(
+            '        <extension name="VK_KHR_subgroup"', (
+            '        <extension name="VK_EXT_sc_only" number="300" type="device" supported="vulkansc">\n'
+            '            <require>\n'
+            '                <enum offset="0" dir="-" extends="VkResult" name="VK_ERROR_SC_ONLY"/>\n'
+            '            </require>\n'
+            '        </extension>\n'
+            '        <extension name="VK_KHR_device_group" number="61" type="device" supported="vulkan">\n'
+            '            <require>\n'
+            '                <enum offset="0" extends="VkStructureType" name="VK_STRUCTURE_TYPE_DEVICE_GROUP_INFO_KHR"/>\n'
+            '            </require>\n'
+            '            <require depends="VK_KHR_swapchain">\n'
+            '                <enum offset="1" extends="VkStructureType" name="VK_STRUCTURE_TYPE_DEVICE_GROUP_SWAPCHAIN_KHR"/>\n'
+            '            </require>\n'
+            '            <require api="vulkansc">\n'
+            '                <enum offset="2" extends="VkStructureType" name="VK_STRUCTURE_TYPE_DEVICE_GROUP_SC_KHR"/>\n'
+            '            </require>\n'
+            '            <require depends="(VK_VERSION_1_1,VK_KHR_surface)+VK_KHR_swapchain">\n'
+            '                <type name="VkClearColorValue"/>\n'
+            '            </require>\n'
+            '        </extension>\n'
+            '        <extension name="VK_KHR_subgroup"'), 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            elements = parse_vk_xml(write_registry(tmp, xml))
+
+        values = set(e.name for enums in elements.enums for e in enums.enums)
+        self.assertIn('VK_STRUCTURE_TYPE_DEVICE_GROUP_SWAPCHAIN_KHR', values)
+        self.assertNotIn('VK_STRUCTURE_TYPE_SC_ONLY', values)
+        self.assertNotIn('VK_ERROR_SC_ONLY', values)
+        self.assertNotIn('VK_STRUCTURE_TYPE_DEVICE_GROUP_SC_KHR', values)
+        self.assertEqual(elements.extensions[3].requires, [
+            Require('VK_KHR_swapchain',
+                    enums=['VK_STRUCTURE_TYPE_DEVICE_GROUP_SWAPCHAIN_KHR']),
+            Require('(VK_VERSION_1_1,VK_KHR_surface)+VK_KHR_swapchain',
+                    types=['VkClearColorValue']),
+        ])
+
+        filtered = filter_elements(elements, '1.1')
+        self.assertEqual([f.name for f in filtered.features],
+                         ['VK_VERSION_1_0', 'VK_VERSION_1_1'])
+        self.assertEqual(filtered.unions, [])
+
+        def structure_types(filtered):
+            return [e.name for e in filtered.enums[0].enums]
+
+        filtered = filter_elements(elements, '1.0', ['VK_KHR_device_group'])
+        self.assertIn('VK_STRUCTURE_TYPE_DEVICE_GROUP_INFO_KHR',
+                      structure_types(filtered))
+        self.assertNotIn('VK_STRUCTURE_TYPE_DEVICE_GROUP_SWAPCHAIN_KHR',
+                         structure_types(filtered))
+
+        filtered = filter_elements(elements, '1.0', [
+            'VK_KHR_device_group', 'VK_KHR_swapchain'])
+        self.assertIn('VK_STRUCTURE_TYPE_DEVICE_GROUP_SWAPCHAIN_KHR',
+                      structure_types(filtered))
+        self.assertEqual(filtered.unions, [])
+        filtered = filter_elements(elements, '1.1', [
+            'VK_KHR_device_group', 'VK_KHR_swapchain'])
+        self.assertEqual([u.name for u in filtered.unions],
+                         ['VkClearColorValue'])
+
+        with self.assertRaises(AssertionError):
+            filter_elements(elements, '1.0', ['VK_EXT_sc_only'])
+
+        self.assertTrue(depends_met('A,B+C', set(['B', 'C'])))
+        self.assertFalse(depends_met('A,B+C', set(['A'])))
+        self.assertTrue(depends_met('A,(B+C)', set(['A'])))
+        self.assertFalse(depends_met('(A+B),C', set(['A'])))
+
+    def test_filter_flag_bits(self):
+        # Only the Flags typedef is required, its FlagBits come along.
+        elements = Elements(
+            basetypes=[
+                BaseType('VkFlags', 'uint32_t'),
+                BaseType('VkQueueFlags', 'VkFlags', 'VkQueueFlagBits'),
+                BaseType('VkCullModeFlags', 'VkFlags', 'VkCullModeFlagBits'),
+            ],
+            enums=[
+                Enums('VkQueueFlagBits', [Enum('VK_QUEUE_GRAPHICS_BIT', 1)],
+                      True),
+                Enums('VkCullModeFlagBits', [Enum('VK_CULL_MODE_NONE', 0)],
+                      True),
+            ],
+            structs=[Struct('VkQueueFamilyProperties', [
+                member('queueFlags', 'VkQueueFlags'),
+            ])],
+            features=[Feature('VK_VERSION_1_0', '1.0',
+                              types=['VkQueueFamilyProperties'])],
+        )
+        filtered = filter_elements(elements, '1.0')
+        self.assertEqual([b.name for b in filtered.basetypes],
+                         ['VkFlags', 'VkQueueFlags'])
+        self.assertEqual([e.name for e in filtered.enums],
+                         ['VkQueueFlagBits'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            parsed = parse_vk_xml(write_registry(tmp))
+        self.assertEqual(parsed.basetypes[3].requires, 'VkQueueFlagBits')
+
+    def test_dependency_graph(self):
+        elements = Elements(
+            basetypes=[BaseType('VkFlags', 'uint32_t'),
+                       BaseType('VkQueueFlags', 'VkFlags')],
+            handles=[Handle('VkInstance')],
+            structs=[
+                Struct('VkBaseOutStructure', [
+                    member('sType', 'VkStructureType'),
+                    member('pNext', 'VkBaseOutStructure *'),
+                ]),
+                Struct('VkQueueFamilyProperties', [
+                    member('queueFlags', 'VkQueueFlags'),
+                    member('pNode', 'const VkNode *'),
+                ]),
+                Struct('VkNode', [
+                    member('pProperties', 'VkQueueFamilyProperties *'),
+                ]),
+            ],
+            enums=[Enums('VkStructureType', [])],
+            commands=[
+                command('vkCreateInstance', 'VkResult', [
+                    param('VkInstance *', 'pInstance'),
+                    param('VkQueueFamilyPropertiesKHR *', 'pProperties'),
+                ]),
+            ],
+            aliases={'VkQueueFamilyPropertiesKHR': 'VkQueueFamilyProperties'})
+        graph = DependencyGraph(elements)
+
+        order = graph.order
+        self.assertLess(order.index('VkFlags'), order.index('VkQueueFlags'))
+        self.assertLess(order.index('VkQueueFlags'),
+                        order.index('VkQueueFamilyProperties'))
+        self.assertLess(order.index('VkStructureType'),
+                        order.index('VkBaseOutStructure'))
+        self.assertEqual(order[-1], 'vkCreateInstance')
+        self.assertEqual(graph.cycles, [
+            ['VkBaseOutStructure'],
+            ['VkQueueFamilyProperties', 'VkNode'],
+        ])
+
+        self.assertEqual(graph.closure('vkCreateInstance'), {
+            'vkCreateInstance', 'VkInstance', 'VkQueueFamilyProperties',
+            'VkNode', 'VkQueueFlags', 'VkFlags'})
+        self.assertEqual(graph.closure('VkQueueFamilyPropertiesKHR'),
+                         graph.closure('VkNode'))
+        component = graph.component_of['VkNode']
+        self.assertIn(component, graph.closures)
+        self.assertIs(graph.component_closure(component),
+                      graph.closures[component])
+
+        elements.structs.append(Struct('VkLoop', [member('loop', 'VkLoop')]))
+        with self.assertRaises(AssertionError):
+            DependencyGraph(elements)
+
+    def test_emit(self):
+        sink = io.StringIO()
+        with Emitter(sink, buffer_size=4) as out:
+            Enums('VkResult', [Enum('VK_SUCCESS', 0),
+                               Enum('VK_NOT_READY', 1)]).emit(out)
+            self.assertNotEqual(sink.getvalue(), '')
+            Struct('VkDescriptorPoolSize', [
+                member('type', 'VkDescriptorType'),
+                member('pNext', 'const void *'),
+                member('pData', 'void *'),
+            ]).emit(out)
+            command('vkDestroyInstance', 'void', [
+                param('VkInstance', 'instance'),
+                param('const VkAllocationCallbacks *', 'pAllocator'),
+            ]).emit(out)
+
+        self.assertEqual(sink.getvalue(), (
+            '#[repr(transparent)]\n'
+            '#[derive(Copy, Clone, PartialEq, Eq, Hash, Debug)]\n'
+            'pub struct VkResult(pub i32);\n'
+            'pub const VK_SUCCESS: VkResult = VkResult(0);\n'
+            'pub const VK_NOT_READY: VkResult = VkResult(1);\n'
+            '#[repr(C)]\n'
+            '#[derive(Copy, Clone)]\n'
+            'pub struct VkDescriptorPoolSize {\n'
+            '    pub r#type: VkDescriptorType,\n'
+            '    pub pNext: *const c_void,\n'
+            '    pub pData: *mut c_void,\n'
+            '}\n'
+            'extern "system" {\n'
+            '    pub fn vkDestroyInstance(instance: VkInstance, '
+            'pAllocator: *const VkAllocationCallbacks);\n'
+            '}\n'))
+        self.assertEqual(BaseType('VkFlags', 'uint32_t').to_rs(),
+                         'pub type VkFlags = u32;\n')
+
+    def test_write_streamed_outputs(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            elements = parse_vk_xml(write_registry(tmp))
+            out_dir = os.path.join(tmp, 'out')
+            report = write_outputs(out_dir, single_outputs(elements))
+            self.assertEqual(report.added, ['vk.rs'])
+            with open(os.path.join(out_dir, 'vk.rs')) as f:
+                self.assertEqual(f.read(),
+                                 render_outputs(elements)['vk.rs'])
+
+            report = write_outputs(out_dir, single_outputs(elements))
+            self.assertEqual(report.unchanged, ['vk.rs'])
+            self.assertEqual(sorted(os.listdir(out_dir)),
+                             sorted([MANIFEST_NAME, 'vk.rs']))
+
+    def test_parallel(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_path = write_registry(tmp)
+            elements = parse_vk_xml(xml_path)
+            self.assertEqual(parse_vk_xml(xml_path, jobs=2), elements)
+
+        outputs = sharded_outputs(elements)
+        rendered = render(outputs, jobs=2)
+        self.assertEqual(list(rendered), list(outputs))
+        self.assertEqual(rendered, render(outputs))
+
+    def test_watch_registry_survives_errors(self):
+        from vkxml2rs.vkxml2rs import watch_registry
+
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_path = write_registry(tmp)
+            elements = parse_vk_xml(xml_path)
+            out = io.StringIO()
+            with mock.patch('modules.watch.watch',
+                            return_value=iter([[xml_path], [xml_path]])), \
+                    mock.patch.object(IncrementalRegistry, 'load',
+                                      side_effect=[elements,
+                                                   ValueError('offset'),
+                                                   elements]), \
+                    contextlib.redirect_stdout(out):
+                watch_registry(xml_path, os.path.join(tmp, 'out'))
+
+        lines = out.getvalue().splitlines()
+        self.assertIn('error: ValueError: offset', lines)
+        self.assertTrue(lines[-1].startswith('regenerated in '))
+
+    def test_incremental_registry(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_path = write_registry(tmp)
+            registry = IncrementalRegistry(xml_path)
+            self.assertEqual(registry.load(), parse_vk_xml(xml_path))
+            sections = registry.reparsed
+            self.assertEqual(registry.load(), parse_vk_xml(xml_path))
+            self.assertEqual(registry.reparsed, 0)
+
+            old = 'bitpos="0"    name="VK_QUEUE_GRAPHICS_BIT"'
+            self.assertIn(old, REGISTRY_XML)
+            write_registry(tmp, REGISTRY_XML.replace(
+                old, 'bitpos="5"    name="VK_QUEUE_GRAPHICS_BIT"'))
+            self.assertEqual(registry.load(), parse_vk_xml(xml_path))
+            self.assertEqual(registry.reparsed, 1)
+            self.assertGreater(sections, 1)
+
+    def test_stamp(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            xml_path = write_registry(tmp)
+            inputs = stamp_inputs(xml_path, {'layout': 'single'})
+            self.assertFalse(is_up_to_date(tmp, inputs))
+            write_stamp(tmp, inputs)
+            self.assertTrue(is_up_to_date(tmp, inputs))
+            self.assertFalse(is_up_to_date(
+                tmp, stamp_inputs(xml_path, {'layout': 'sharded'})))
+
+            write_registry(tmp, REGISTRY_XML.replace('1.1', '1.2'))
+            self.assertFalse(is_up_to_date(
+                tmp, stamp_inputs(xml_path, {'layout': 'single'})))
+
+        self.assertIn(os.path.abspath(stamp.__file__), generator_sources())
+
+    def test_registry_sections(self):
+        data = (b'<registry><comment>c</comment>'
+                b'<!-- <types> in a comment -->'
+                b'<types><type/></types>'
+                b'<enums name="A"/>'
+                b'<feature name="F"><require/></feature>'
+                b'</registry>')
+        self.assertEqual(
+            [data[start:end] for start, end in registry_sections(data)],
+            [b'<types><type/></types>',
+             b'<enums name="A"/>',
+             b'<feature name="F"><require/></feature>'])
+
+    def test_section_pieces(self):
+        data = (b'<registry>'
+                b'<types comment="t">'
+                b'<type category="struct" name="A">'
+                b'<member><type>uint32_t</type> <name>a</name></member>'
+                b'</type>'
+                b'<!-- <type category="struct" name="B"></type> -->'
+                b'<type category="struct" name="C"/>'
+                b'</types>'
+                b'<enums name="E"/>'
+                b'</registry>')
+        pieces = section_pieces(data, 1, min_piece_size=8)
+        self.assertEqual(
+            [(data[start:end], tag) for start, end, tag in pieces], [
+                (b'<type category="struct" name="A">'
+                 b'<member><type>uint32_t</type> <name>a</name></member>'
+                 b'</type>'
+                 b'<!-- <type category="struct" name="B"></type> -->',
+                 b'types'),
+                (b'<type category="struct" name="C"/>', b'types'),
+                (b'<enums name="E"/>', None),
+            ])
+
+        elements = Elements()
+        pending = {}
+        for start, end, tag in pieces:
+            merge_elements(elements, pending, *parse_section(
+                wrap_section(data[start:end], tag)))
+        self.assertEqual([s.name for s in elements.structs], ['A', 'C'])
+
+    def test_profiler(self):
+        profiler = Profiler(top=3)
+        with tempfile.TemporaryDirectory() as tmp:
+            with profiler.phase('parse'):
+                elements = parse_vk_xml(write_registry(tmp))
+            with profiler.phase('emit'):
+                report = write_outputs(os.path.join(tmp, 'out'),
+                                       single_outputs(elements))
+        profiler.set('counts', element_counts(elements))
+        profiler.set('aliases_resolved', alias_count(elements))
+
+        result = profiler.report()
+        self.assertEqual(list(result['phases']), ['parse', 'emit'])
+        self.assertGreater(result['phases']['parse']['wall_seconds'], 0)
+        self.assertEqual(result['counts']['structs'], 1)
+        self.assertEqual(result['counts']['enum_values'], 16)
+        self.assertEqual(result['aliases_resolved'], 5)
+        self.assertEqual(len(result['hot_functions']), 3)
+        self.assertGreater(report.bytes_written, 0)
+        self.assertEqual(report.bytes_written, report.bytes_generated)
 
 
 if __name__ == '__main__':
@@ -0,0 +1 @@
+GENERATOR_VERSION = '0.9.3'
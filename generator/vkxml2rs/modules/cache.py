@@ -0,0 +1,101 @@
+import hashlib
+import os
+import pickle
+
+from . import GENERATOR_VERSION
+from .elements import *
+from .names import enum_name_tables
+from .parse import parse_vk_xml
+from .stamp import file_digest
+
+CACHE_MAGIC = b'VKXML2RS'
+KEY_SIZE = 64
+DIGEST_SIZE = 32
+
+
+def default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME')
+    if not cache_home:
+        cache_home = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'vkxml2rs')
+
+
+def cache_key(xml_path: str):
+    key = file_digest(xml_path) + GENERATOR_VERSION
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def cache_path(xml_path: str, cache_dir: str):
+    # One slot per registry path, so a changed vk.xml overwrites its own
+    # stale entry instead of piling up new ones.
+    path_hash = hashlib.sha256(os.path.abspath(xml_path).encode())
+    name = os.path.basename(xml_path) + '-' + path_hash.hexdigest()[:16]
+    return os.path.join(cache_dir, name + '.cache')
+
+
+def read_cache(path: str, key: str):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    header_size = len(CACHE_MAGIC) + KEY_SIZE + DIGEST_SIZE
+    if len(data) < header_size or not data.startswith(CACHE_MAGIC):
+        return None
+
+    offset = len(CACHE_MAGIC)
+    if data[offset:offset + KEY_SIZE] != key.encode():
+        return None
+
+    offset += KEY_SIZE
+    digest = data[offset:offset + DIGEST_SIZE]
+    payload = data[header_size:]
+    if hashlib.sha256(payload).digest() != digest:
+        return None
+
+    try:
+        elements = pickle.loads(payload)
+    except Exception:
+        return None
+
+    if not isinstance(elements, Elements):
+        return None
+
+    return elements
+
+
+def write_cache(path: str, key: str, elements: Elements):
+    payload = pickle.dumps(elements, protocol=pickle.HIGHEST_PROTOCOL)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to a temporary file first so that concurrent generator jobs never
+    # see a half written cache.
+    tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(CACHE_MAGIC)
+        f.write(key.encode())
+        f.write(hashlib.sha256(payload).digest())
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def load_elements(xml_path: str, cache_dir: str = None, jobs: int = 1,
+                  profiler=None):
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+
+    key = cache_key(xml_path)
+    path = cache_path(xml_path, cache_dir)
+    elements = read_cache(path, key)
+    if profiler is not None:
+        profiler.set('cache_hit', elements is not None)
+    if elements is None:
+        elements = parse_vk_xml(xml_path, jobs)
+        enum_name_tables(elements)
+        try:
+            write_cache(path, key, elements)
+        except OSError:
+            pass
+
+    return elements
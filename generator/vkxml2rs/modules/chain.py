@@ -0,0 +1,29 @@
+from .dispatch import resolve_alias
+from .elements import *
+
+STRUCTURE_TYPE_ENUM = 'VkStructureType'
+
+
+def structure_chains(elements: Elements):
+    # Only structs whose sType value survived filtering become chain links,
+    # and only links between two of them are legal.
+    s_types = set()
+    for enums in elements.enums:
+        if enums.name == STRUCTURE_TYPE_ENUM:
+            s_types.update(e.name for e in enums.enums)
+
+    tagged = set(s.name for s in elements.structs if s.s_type in s_types)
+    if not tagged:
+        return []
+
+    chains = [ChainTypes()]
+    for struct in elements.structs:
+        if struct.name not in tagged:
+            continue
+        extends = []
+        for name in struct.extends:
+            name = resolve_alias(name, elements.aliases)
+            if name in tagged and name not in extends:
+                extends.append(name)
+        chains.append(StructureChain(struct.name, struct.s_type, extends))
+    return chains
@@ -0,0 +1,112 @@
+from .elements import *
+
+GLOBAL = 'global'
+INSTANCE = 'instance'
+DEVICE = 'device'
+
+DISPATCH_TABLES = [
+    (GLOBAL, 'GlobalDispatch'),
+    (INSTANCE, 'InstanceDispatch'),
+    (DEVICE, 'DeviceDispatch'),
+]
+
+# The loader entry point itself, resolved from the library rather than
+# through a table.
+LOADER_COMMAND = 'vkGetInstanceProcAddr'
+
+
+def resolve_alias(name: str, aliases: dict):
+    seen = set()
+    while name in aliases and name not in seen:
+        seen.add(name)
+        name = aliases[name]
+    return name
+
+
+class CommandLevels:
+    # Classifies commands by the handle tree below their first parameter.
+    def __init__(self, elements: Elements):
+        self.aliases = elements.aliases
+        self.parents = dict((h.name, h.parent) for h in elements.handles)
+        self.levels = {}
+
+    def handle_level(self, name: str):
+        name = resolve_alias(name, self.aliases)
+        if name in self.levels:
+            return self.levels[name]
+
+        level = None
+        if name == 'VkDevice':
+            level = DEVICE
+        elif name == 'VkInstance':
+            level = INSTANCE
+        elif self.parents.get(name):
+            level = self.handle_level(self.parents[name])
+        self.levels[name] = level
+        return level
+
+    def command_level(self, command: Command):
+        # vkGetDeviceProcAddr takes a device, but is itself resolved through
+        # the instance.
+        if command.name == 'vkGetDeviceProcAddr':
+            return INSTANCE
+        if not command.params or command.params[0].type_.pointers:
+            return GLOBAL
+        return self.handle_level(command.params[0].type_.name) or GLOBAL
+
+
+def command_aliases(elements: Elements):
+    aliases = {}
+    for name, target in elements.aliases.items():
+        if name.startswith('vk'):
+            aliases.setdefault(resolve_alias(target, elements.aliases),
+                               []).append(name)
+    return aliases
+
+
+COUNT_TYPES = {'uint32_t', 'size_t'}
+
+
+def enumeration(command: Command, templates: set):
+    if command.return_type not in (TypeRef('VkResult'), TypeRef('void')):
+        return None
+
+    counts = dict((p.name, p) for p in command.params
+                  if p.type_.pointers == 1 and not p.type_.const
+                  and p.type_.name in COUNT_TYPES and p.len_ is None)
+    for array in command.params:
+        if array.len_ is None or array.type_.pointers != 1 or \
+                array.type_.const or array.type_.name == 'void':
+            continue
+        count = counts.get(array.len_.split(',')[0])
+        if count is not None:
+            return Enumeration(command, count, array,
+                               array.type_.name in templates)
+    return None
+
+
+def structure_types(elements: Elements):
+    return set(s.name for s in elements.structs
+               if s.members and s.members[0].name == 'sType')
+
+
+def dispatch_tables(elements: Elements):
+    levels = CommandLevels(elements)
+    aliases = command_aliases(elements)
+    templates = structure_types(elements)
+    commands = dict((level, []) for level, name in DISPATCH_TABLES)
+    for command in elements.commands:
+        if command.name != LOADER_COMMAND:
+            commands[levels.command_level(command)].append(command)
+
+    tables = []
+    for level, name in DISPATCH_TABLES:
+        if not commands[level]:
+            continue
+        table_aliases = dict((c.name, aliases[c.name])
+                             for c in commands[level] if c.name in aliases)
+        enumerations = [enumeration(c, templates) for c in commands[level]]
+        tables.append(DispatchTable(name, level, commands[level],
+                                    table_aliases,
+                                    [e for e in enumerations if e]))
+    return tables
@@ -1,138 +1,737 @@
 import dataclasses
+import re
 from dataclasses import dataclass, field
-from typing import List
+from typing import Dict, List, Optional, Tuple
+
+from .emit import emit_to_string
+
+
+RS_KEYWORDS = {'as', 'box', 'break', 'const', 'continue', 'crate', 'else',
+               'enum', 'extern', 'fn', 'for', 'if', 'impl', 'in', 'let',
+               'loop', 'match', 'mod', 'move', 'mut', 'pub', 'ref', 'return',
+               'static', 'struct', 'super', 'trait', 'type', 'unsafe', 'use',
+               'where', 'while'}
+
+
+RS_TYPES = {'void': 'c_void',
+            'char': 'c_char',
+            'float': 'f32',
+            'double': 'f64',
+            'int8_t': 'i8',
+            'uint8_t': 'u8',
+            'int16_t': 'i16',
+            'uint16_t': 'u16',
+            'uint32_t': 'u32',
+            'uint64_t': 'u64',
+            'int32_t': 'i32',
+            'int64_t': 'i64',
+            'size_t': 'usize',
+            'int': 'c_int', }
 
 
 def c_type_to_rs_type(c_type: str):
+    return RS_TYPES.get(c_type, c_type)
+
+
+class TypeRef:
+    # Interned, so every member or parameter of the same C type shares one
+    # instance and compares by identity.
+    __slots__ = ('name', 'const', 'pointers', 'array', '_rs', '_decayed')
+    interned = {}
+
+    def __new__(cls, name: str, const: bool = False, pointers: int = 0,
+                array: Tuple[str, ...] = ()):
+        key = (name, const, pointers, array)
+        ref = cls.interned.get(key)
+        if ref is None:
+            ref = object.__new__(cls)
+            ref.name = name
+            ref.const = const
+            ref.pointers = pointers
+            ref.array = array
+            ref._rs = None
+            ref._decayed = None
+            cls.interned[key] = ref
+        return ref
+
+    def __reduce__(self):
+        return TypeRef, (self.name, self.const, self.pointers, self.array)
+
+    def __repr__(self):
+        return 'TypeRef(%r)' % self.c_decl()
+
+    def c_decl(self):
+        decl = self.name
+        if self.const:
+            decl = 'const ' + decl
+        if self.pointers:
+            decl += ' ' + '*' * self.pointers
+        return decl + ''.join('[' + length + ']' for length in self.array)
+
+    def rs(self):
+        if self._rs is None:
+            rs = c_type_to_rs_type(self.name)
+            pointer = '*const ' if self.const else '*mut '
+            for _ in range(self.pointers):
+                rs = pointer + rs
+            for length in reversed(self.array):
+                if not length.isdigit():
+                    # API constants keep their registry type.
+                    length += ' as usize'
+                rs = '[' + rs + '; ' + length + ']'
+            self._rs = rs
+        return self._rs
+
+    def is_void(self):
+        return self.name == 'void' and not self.pointers and not self.array
+
+    def decayed(self):
+        # As a parameter, an array is passed as a pointer to its first
+        # element. Pointers to arrays cannot be spelled as a TypeRef, so
+        # inner dimensions decay to their first scalar, which has the same
+        # ABI.
+        if self._decayed is None:
+            if self.array:
+                self._decayed = TypeRef(self.name, self.const,
+                                        self.pointers + 1)
+            else:
+                self._decayed = self
+        return self._decayed
+
+
+def type_ref(c_decl: str):
+    array = []
+    while c_decl.endswith(']'):
+        start = c_decl.rindex('[')
+        array.insert(0, c_decl[start + 1:-1].strip())
+        c_decl = c_decl[:start]
+
+    pointers = c_decl.count('*')
+    words = c_decl.replace('*', ' ').split()
+    const = 'const' in words
+    name = ' '.join(w for w in words if w != 'const')
+    return TypeRef(name, const, pointers, tuple(array))
+
+
+# ~N complements with an optional U or ULL suffix and subtrahend.
+COMPLEMENT_PATTERN = re.compile(r'~(\d+)(ULL|U)?(?:\s*-\s*(\d+))?$')
+
+
+def c_constant_to_rs(value: str, c_type: str = None):
+    # API constants are plain integers, float literals or complements such
+    # as (~0U-1) and (~2U). Their type comes from the registry when it names
+    # one.
+    value = value.strip('()')
+    if value[-1] in 'fF':
+        return c_type_to_rs_type(c_type or 'float'), value[:-1]
+    match = COMPLEMENT_PATTERN.match(value)
+    if match is not None:
+        number, suffix, rest = match.groups()
+        default_type = 'uint64_t' if suffix == 'ULL' else 'uint32_t'
+        rs_type = c_type_to_rs_type(c_type or default_type)
+        if rest:
+            return rs_type, '!' + number + ' - ' + rest
+        return rs_type, '!' + number
+    return c_type_to_rs_type(c_type or 'uint32_t'), value
+
+
+def rs_name(name: str):
+    if name in RS_KEYWORDS:
+        return 'r#' + name
+    return name
+
+
+def emit_params(out, params):
+    for i, p in enumerate(params):
+        if i > 0:
+            out.write(', ')
+        out.write(rs_name(p.name), ': ', p.type_.decayed().rs())
+
+
+def emit_return_type(out, return_type: TypeRef):
+    if not return_type.is_void():
+        out.write(' -> ', return_type.rs())
+
+
+def emit_fn_pointer(out, return_type: TypeRef, params):
+    out.write('Option<unsafe extern "system" fn(')
+    emit_params(out, params)
+    out.write(')')
+    emit_return_type(out, return_type)
+    out.write('>')
+
+
+def emit_members(out, members):
+    for m in members:
+        out.write('    pub ', rs_name(m.name), ': ', m.type_.rs(), ',\n')
+
+
+class RsElement:
+    def to_rs(self):
+        return emit_to_string(self.emit)
 
-    table = {'void': 'c_void',
-             'char': 'i8',
-             'float': 'f32',
-             'double': 'f64',
-             'uint8_t': 'u8',
-             'uint16_t': 'u16',
-             'uint32_t': 'u32',
-             'uint64_t': 'u64',
-             'int32_t': 'i32',
-             'int64_t': 'i64',
-             'size_t': 'size_t',
-             'int': 'i32', }
 
-    return table.get(c_type, c_type)
+@dataclass
+class BaseType(RsElement):
+    name: str
+    typedef: Optional[str]
+    # The FlagBits enum holding the bits of a bitmask type.
+    requires: Optional[str] = None
+
+    def emit(self, out):
+        if self.typedef is None:
+            out.write('pub enum ', self.name, ' {}\n')
+        else:
+            out.write('pub type ', self.name, ' = ',
+                      c_type_to_rs_type(self.typedef), ';\n')
 
 
 @dataclass
-class BaseType:
+class Constant(RsElement):
     name: str
-    typedef: str
+    value: str
+    alias: Optional[str] = None
+    # C type named by the registry's type attribute.
+    type_: Optional[str] = None
 
-    def to_rs(self):
-        return ('type ' + self.name
-                + ' = '
-                + c_type_to_rs_type(self.typedef) + ';\n')
+    def emit(self, out):
+        rs_type, rs_value = c_constant_to_rs(self.value, self.type_)
+        if self.alias:
+            rs_value = self.alias
+        out.write('pub const ', self.name, ': ', rs_type, ' = ', rs_value,
+                  ';\n')
 
 
 @dataclass
-class Handle:
+class Handle(RsElement):
     name: str
+    parent: Optional[str] = None
 
-    def to_rs(self):
-        return ('enum ' + self.name + '_t { }\n'
-                + 'type ' + self.name + ' = *mut ' + self.name + ';\n')
+    def emit(self, out):
+        out.write('pub enum ', self.name, '_T {}\n',
+                  'pub type ', self.name, ' = *mut ', self.name, '_T;\n')
 
 
 @dataclass
 class Param:
-    type_: str
+    type_: TypeRef
     name: str
+    # Registry len and optional attributes. optional has one flag per
+    # pointer level, e.g. "false,true" for a count that is written back.
+    len_: Optional[str] = None
+    optional: Tuple[bool, ...] = ()
 
 
 @dataclass
-class FuncPointer:
+class FuncPointer(RsElement):
     name: str
-    return_type: str
+    return_type: TypeRef
     params: List[Param]
 
-    def to_rs(self):
-        rs = ('type ' + self.name + ' = ' +
-              '::std::option::Option<extern "C" fn(')
-        rs_params = map(lambda p: p.name + ': ' + p.type_, self.params)
-        rs += ', '.join(rs_params)
-        rs += ');\n'
-
-        return rs
+    def emit(self, out):
+        out.write('pub type ', self.name, ' = ')
+        emit_fn_pointer(out, self.return_type, self.params)
+        out.write(';\n')
 
 
 @dataclass
 class Enum:
     name: str
-    value: int
+    value: Optional[int]
+    alias: Optional[str] = None
 
 
 @dataclass
-class Enums:
+class Enums(RsElement):
     name: str
     enums: List[Enum]
-
-    def to_rs(self):
-        rs = ('struct ' + self.name + '(u32);')
+    bitmask: bool = False
+    bitwidth: int = 32
+    # Name lookup tables, built on first use.
+    names: Optional['EnumNames'] = field(default=None, compare=False,
+                                         repr=False)
+
+    def repr_type(self):
+        if not self.bitmask:
+            return 'i32'
+        return 'u64' if self.bitwidth == 64 else 'u32'
+
+    def emit(self, out):
+        out.write('#[repr(transparent)]\n',
+                  '#[derive(Copy, Clone, PartialEq, Eq, Hash, Debug)]\n',
+                  'pub struct ', self.name, '(pub ', self.repr_type(),
+                  ');\n')
         for e in self.enums:
-            rs += e.name + ': ' + self.name + ' = ' + e.value + ';\n'
-
-        return rs
+            out.write('pub const ', e.name, ': ', self.name, ' = ',
+                      self.name, '(', str(e.value), ');\n')
 
 
 @dataclass
 class Member:
     name: str
-    type_: str
+    type_: TypeRef
+    len_: Optional[str] = None
+    optional: Tuple[bool, ...] = ()
 
 
 @dataclass
-class Struct:
+class Struct(RsElement):
     name: str
     members: List[Member]
+    # The VkStructureType value of the sType member, and the structs this one
+    # may be chained into through their pNext.
+    s_type: Optional[str] = None
+    extends: List[str] = field(default_factory=list)
 
-    def to_rs(self):
-        rs = '#[repr(C)]'
-        rs += ('struct ' + self.name + ' {\n')
-        for m in self.members:
-            rs += '    ' + m.name + ': ' + c_type_to_rs_type(m.type_) + ',\n'
-        rs += '}\n'
-        return rs
+    def emit(self, out):
+        out.write('#[repr(C)]\n',
+                  '#[derive(Copy, Clone)]\n',
+                  'pub struct ', self.name, ' {\n')
+        emit_members(out, self.members)
+        out.write('}\n')
 
 
 @dataclass
-class Union:
+class Union(RsElement):
     name: str
     members: List[Member]
 
-    def to_rs(self):
-        rs = '#[repr(C)]'
-        rs += ('union ' + self.name + ' {\n')
-        for m in self.members:
-            rs += '    ' + m.name + ': ' + c_type_to_rs_type(m.type_) + ',\n'
-        rs += '}\n'
-        return rs
+    def emit(self, out):
+        out.write('#[repr(C)]\n',
+                  '#[derive(Copy, Clone)]\n',
+                  'pub union ', self.name, ' {\n')
+        emit_members(out, self.members)
+        out.write('}\n')
 
 
 @dataclass
-class Command:
+class Command(RsElement):
     name: str
-    return_type: str
+    return_type: TypeRef
     params: List[Param]
 
-    def to_rs(self):
-        rs = ('extern "C" fn(')
-        rs_params = map(lambda p: p.name + ': ' + p.type_, self.params)
-        rs += ', '.join(rs_params)
-        rs += ');\n'
+    def emit(self, out):
+        out.write('extern "system" {\n',
+                  '    pub fn ', self.name, '(')
+        emit_params(out, self.params)
+        out.write(')')
+        emit_return_type(out, self.return_type)
+        out.write(';\n}\n')
+
+
+VK_INCOMPLETE = 5
+
+
+def snake_case(name: str):
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', name).lower()
+
+
+@dataclass
+class Enumeration:
+    # A command following the two-call pattern: called once for the count
+    # of array elements and once more to fill them in.
+    command: Command
+    count: Param
+    array: Param
+    # The elements carry an sType, so new slots are copied from a caller
+    # supplied template instead of zeroed.
+    template: bool = False
+
+    def emit_call(self, out, count: str, array: str):
+        out.write('f(')
+        for i, p in enumerate(self.command.params):
+            if i > 0:
+                out.write(', ')
+            if p is self.count:
+                out.write(count)
+            elif p is self.array:
+                out.write(array)
+            else:
+                out.write(rs_name(p.name))
+        out.write(')')
+
+    def emit_params(self, out):
+        for p in self.command.params:
+            if p is not self.count and p is not self.array:
+                out.write(', ', rs_name(p.name), ': ',
+                          p.type_.decayed().rs())
+
+    def emit(self, out):
+        command = self.command
+        name = snake_case(command.name[2:])
+        element = TypeRef(self.array.type_.name).rs()
+        count = TypeRef(self.count.type_.name).rs()
+        has_result = command.return_type is TypeRef('VkResult')
+
+        out.write('    pub unsafe fn ', name, '_into_vec(&self')
+        self.emit_params(out)
+        out.write(', out: &mut Vec<', element, '>')
+        if self.template:
+            out.write(', template: ', element)
+        out.write(')')
+        if has_result:
+            out.write(' -> VkResult')
+        out.write(' {\n',
+                  '        let f = self.', command.name, '.expect("',
+                  command.name, ' is not loaded");\n')
+        if has_result:
+            out.write('        loop {\n')
+        indent = '            ' if has_result else '        '
+        out.write(indent, 'let mut count: ', count, ' = 0;\n', indent)
+        if has_result:
+            out.write('let result = ')
+        self.emit_call(out, '&mut count', 'std::ptr::null_mut()')
+        out.write(';\n')
+        if has_result:
+            out.write(indent, 'if result.0 < 0 {\n',
+                      indent, '    return result;\n',
+                      indent, '}\n')
+        # clear and resize keep the capacity, so a reused buffer only
+        # allocates when the count grows.
+        out.write(indent, 'out.clear();\n',
+                  indent, 'out.resize(count as usize, ',
+                  'template' if self.template else 'std::mem::zeroed()',
+                  ');\n', indent)
+        if has_result:
+            out.write('let result = ')
+        self.emit_call(out, '&mut count', 'out.as_mut_ptr()')
+        out.write(';\n',
+                  indent, 'out.truncate(count as usize);\n')
+        if has_result:
+            # VK_INCOMPLETE: the count grew between the two calls.
+            out.write('            if result != VkResult(',
+                      str(VK_INCOMPLETE), ') {\n',
+                      '                return result;\n',
+                      '            }\n',
+                      '        }\n')
+        out.write('    }\n\n')
+
+        out.write('    pub unsafe fn ', name, '_into_slice(&self')
+        self.emit_params(out)
+        out.write(', out: &mut [', element, '])')
+        out.write(' -> (VkResult, usize)' if has_result else ' -> usize')
+        out.write(' {\n',
+                  '        let f = self.', command.name, '.expect("',
+                  command.name, ' is not loaded");\n',
+                  '        let mut count = out.len() as ', count, ';\n',
+                  '        ')
+        if has_result:
+            out.write('let result = ')
+        self.emit_call(out, '&mut count', 'out.as_mut_ptr()')
+        out.write(';\n')
+        if has_result:
+            out.write('        (result, count as usize)\n')
+        else:
+            out.write('        count as usize\n')
+        out.write('    }\n')
+
+
+# Shared by every chain: the leading sType and pNext members of a tagged
+# struct, and the traits and builder generated chain links implement.
+CHAIN_TYPES = """\
+#[repr(C)]
+struct ChainLink {
+    sType: VkStructureType,
+    pNext: *mut c_void,
+}
+
+pub unsafe trait TaggedStructure: Copy {
+    const STRUCTURE_TYPE: VkStructureType;
+}
+
+pub unsafe trait Extends<T: TaggedStructure>: TaggedStructure {}
+
+pub struct Chain<'a, T: TaggedStructure> {
+    root: T,
+    marker: std::marker::PhantomData<&'a mut c_void>,
+}
+
+impl<'a, T: TaggedStructure> Chain<'a, T> {
+    pub fn new(mut root: T) -> Self {
+        unsafe {
+            let link = &mut root as *mut T as *mut ChainLink;
+            (*link).sType = T::STRUCTURE_TYPE;
+            (*link).pNext = std::ptr::null_mut();
+        }
+        Chain { root, marker: std::marker::PhantomData }
+    }
+
+    pub fn push<N: Extends<T>>(mut self, next: &'a mut N) -> Self {
+        unsafe {
+            let root = &mut self.root as *mut T as *mut ChainLink;
+            let link = next as *mut N as *mut ChainLink;
+            (*link).sType = N::STRUCTURE_TYPE;
+            (*link).pNext = (*root).pNext;
+            (*root).pNext = link as *mut c_void;
+        }
+        self
+    }
+
+    pub fn as_ptr(&self) -> *const T {
+        &self.root
+    }
+
+    pub fn as_mut_ptr(&mut self) -> *mut T {
+        &mut self.root
+    }
+}
+
+impl<'a, T: TaggedStructure> std::ops::Deref for Chain<'a, T> {
+    type Target = T;
+
+    fn deref(&self) -> &T {
+        &self.root
+    }
+}
+"""
+
+
+@dataclass
+class ChainTypes(RsElement):
+    name: str = 'Chain'
+
+    def emit(self, out):
+        out.write(CHAIN_TYPES)
+
+
+@dataclass
+class StructureChain(RsElement):
+    name: str
+    s_type: str
+    extends: List[str] = field(default_factory=list)
+
+    def emit(self, out):
+        out.write('unsafe impl TaggedStructure for ', self.name, ' {\n',
+                  '    const STRUCTURE_TYPE: VkStructureType = ',
+                  self.s_type, ';\n',
+                  '}\n')
+        for name in self.extends:
+            out.write('unsafe impl Extends<', name, '> for ', self.name,
+                      ' {}\n')
+
+
+NAME_HASH = """\
+pub const fn enum_name_hash(name: &[u8]) -> u32 {
+    let mut hash: u32 = 0x811c9dc5;
+    let mut i = 0;
+    while i < name.len() {
+        hash = (hash ^ name[i] as u32).wrapping_mul(0x01000193);
+        i += 1;
+    }
+    hash
+}
+
+pub const fn enum_name_mix(mut hash: u32) -> u32 {
+    hash ^= hash >> 16;
+    hash = hash.wrapping_mul(0x85ebca6b);
+    hash ^= hash >> 13;
+    hash = hash.wrapping_mul(0xc2b2ae35);
+    hash ^ (hash >> 16)
+}
+"""
+
+
+@dataclass
+class NameHash(RsElement):
+    name: str = 'enum_name_hash'
+
+    def emit(self, out):
+        out.write(NAME_HASH)
+
+
+@dataclass
+class EnumNames(RsElement):
+    name: str
+    repr_type: str
+    # (value, canonical name), sorted by value.
+    values: List[Tuple[int, str]]
+    # Perfect hash displacement seed per bucket, and the (name, value) entry
+    # stored in each slot, None for unused slots. Without seeds, the slots
+    # are matched one by one.
+    seeds: List[int]
+    slots: List[Optional[Tuple[str, int]]]
+
+    def is_dense(self):
+        span = self.values[-1][0] - self.values[0][0] + 1
+        return span <= 2 * len(self.values)
+
+    def emit_name(self, out, repr_type: str):
+        out.write('    pub fn name(self) -> Option<&\'static str> {\n')
+        if self.is_dense():
+            first = self.values[0][0]
+            names = dict(self.values)
+            span = self.values[-1][0] - first + 1
+            out.write('        static NAMES: [&str; ', str(span), '] = [\n')
+            for value in range(first, first + span):
+                out.write('            "', names.get(value, ''), '",\n')
+            out.write('        ];\n',
+                      '        match NAMES.get(self.0.wrapping_sub(',
+                      str(first), ') as usize) {\n',
+                      '            Some(name) if !name.is_empty() => '
+                      'Some(name),\n',
+                      '            _ => None,\n',
+                      '        }\n')
+        else:
+            out.write('        static VALUES: [(', repr_type, ', &str); ',
+                      str(len(self.values)), '] = [\n')
+            for value, name in self.values:
+                out.write('            (', str(value), ', "', name, '"),\n')
+            out.write('        ];\n',
+                      '        VALUES.binary_search_by_key(&self.0, '
+                      '|entry| entry.0).ok().map(|i| VALUES[i].1)\n')
+        out.write('    }\n')
+
+    def emit_from_name(self, out, repr_type: str):
+        out.write('    pub fn from_name(name: &str) -> Option<Self> {\n')
+        if not self.seeds:
+            out.write('        match name {\n')
+            for name, value in self.slots:
+                out.write('            "', name, '" => Some(', self.name, '(',
+                          str(value), ')),\n')
+            out.write('            _ => None,\n',
+                      '        }\n',
+                      '    }\n')
+            return
+        out.write('        static SEEDS: [u32; ', str(len(self.seeds)),
+                  '] = [')
+        for i, seed in enumerate(self.seeds):
+            out.write(', ' if i > 0 else '', str(seed))
+        out.write('];\n',
+                  '        static SLOTS: [(&str, ', repr_type, '); ',
+                  str(len(self.slots)), '] = [\n')
+        for slot in self.slots:
+            name, value = slot if slot is not None else ('', 0)
+            out.write('            ("', name, '", ', str(value), '),\n')
+        out.write('        ];\n',
+                  '        let hash = enum_name_hash(name.as_bytes());\n',
+                  '        let seed = SEEDS[enum_name_mix(hash) as usize % ',
+                  str(len(self.seeds)), '];\n',
+                  '        let (entry, value) = SLOTS[enum_name_mix(hash ^ '
+                  'seed) as usize % ', str(len(self.slots)), '];\n',
+                  '        if !name.is_empty() && entry == name {\n',
+                  '            Some(', self.name, '(value))\n',
+                  '        } else {\n',
+                  '            None\n',
+                  '        }\n',
+                  '    }\n')
+
+    def emit(self, out):
+        out.write('impl ', self.name, ' {\n')
+        self.emit_name(out, self.repr_type)
+        out.write('\n')
+        self.emit_from_name(out, self.repr_type)
+        out.write('}\n')
+
+
+# Proc address loader parameter per dispatch level: the handle type it
+# takes and the handle passed for it.
+DISPATCH_LOADERS = {
+    'global': ('VkInstance', None),
+    'instance': ('VkInstance', 'instance'),
+    'device': ('VkDevice', 'device'),
+}
+
+
+@dataclass
+class DispatchTable(RsElement):
+    name: str
+    level: str
+    commands: List[Command]
+    # Command name -> other names it may be exported under.
+    aliases: Dict[str, List[str]] = field(default_factory=dict)
+    enumerations: List[Enumeration] = field(default_factory=list)
+
+    def emit(self, out):
+        out.write('#[repr(C)]\n',
+                  '#[derive(Copy, Clone)]\n',
+                  'pub struct ', self.name, ' {\n')
+        for command in self.commands:
+            out.write('    pub ', command.name, ': ')
+            emit_fn_pointer(out, command.return_type, command.params)
+            out.write(',\n')
+        out.write('}\n\n')
+
+        handle_type, handle = DISPATCH_LOADERS[self.level]
+        out.write('impl ', self.name, ' {\n',
+                  '    pub unsafe fn load(\n')
+        if handle is not None:
+            out.write('        ', handle, ': ', handle_type, ',\n')
+        out.write('        get_proc_addr: unsafe extern "system" fn(',
+                  handle_type, ', *const c_char)\n',
+                  '            -> Option<unsafe extern "system" fn()>,\n',
+                  '    ) -> ', self.name, ' {\n',
+                  '        let load = |name: &[u8]| get_proc_addr(',
+                  handle or 'std::ptr::null_mut()',
+                  ', name.as_ptr() as *const c_char);\n',
+                  '        ', self.name, ' {\n')
+        for command in self.commands:
+            out.write('            ', command.name,
+                      ': std::mem::transmute(load(b"', command.name, '\\0")')
+            for alias in self.aliases.get(command.name, []):
+                out.write('.or_else(|| load(b"', alias, '\\0"))')
+            out.write('),\n')
+        out.write('        }\n',
+                  '    }\n',
+                  '}\n')
+
+        if self.enumerations:
+            out.write('\nimpl ', self.name, ' {\n')
+            for i, enumeration in enumerate(self.enumerations):
+                if i > 0:
+                    out.write('\n')
+                enumeration.emit(out)
+            out.write('}\n')
+
+
+def supports_vulkan(apis: str):
+    # api and supported attributes list every API a definition belongs to,
+    # such as "vulkan,vulkansc".
+    return 'vulkan' in apis.split(',')
+
+
+@dataclass
+class Require:
+    # A <require> block that only applies when its depends expression holds
+    # for the selected features and extensions.
+    depends: str
+    types: List[str] = field(default_factory=list)
+    enums: List[str] = field(default_factory=list)
+    commands: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Feature:
+    name: str
+    number: str
+    types: List[str] = field(default_factory=list)
+    enums: List[str] = field(default_factory=list)
+    commands: List[str] = field(default_factory=list)
+    api: str = 'vulkan'
+    requires: List[Require] = field(default_factory=list)
+
+
+@dataclass
+class Extension:
+    name: str
+    number: int
+    supported: str
+    types: List[str] = field(default_factory=list)
+    enums: List[str] = field(default_factory=list)
+    commands: List[str] = field(default_factory=list)
+    requires: List[Require] = field(default_factory=list)
+
 
-        return rs
+def interface_names(interface):
+    # Everything a feature or extension requires, whatever its conditions.
+    names = interface.types + interface.enums + interface.commands
+    for require in interface.requires:
+        names += require.types + require.enums + require.commands
+    return names
 
 
 @dataclass
 class Elements:
+    constants: List[Constant] = field(default_factory=list)
     basetypes: List[BaseType] = field(default_factory=list)
     handles: List[Handle] = field(default_factory=list)
     functionpointers: List[FuncPointer] = field(default_factory=list)
@@ -140,3 +739,6 @@ class Elements:
     structs: List[Struct] = field(default_factory=list)
     unions: List[Union] = field(default_factory=list)
     commands: List[Command] = field(default_factory=list)
+    features: List[Feature] = field(default_factory=list)
+    extensions: List[Extension] = field(default_factory=list)
+    aliases: Dict[str, str] = field(default_factory=dict)
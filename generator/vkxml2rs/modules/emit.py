@@ -0,0 +1,35 @@
+import io
+
+DEFAULT_BUFFER_SIZE = 4096
+
+
+class Emitter:
+    # Collects fragments and hands them to the sink in joined batches, so
+    # the output is written in one pass without building it up in memory.
+    def __init__(self, sink, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.sink = sink
+        self.buffer_size = buffer_size
+        self.fragments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.flush()
+
+    def write(self, *fragments):
+        self.fragments += fragments
+        if len(self.fragments) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.fragments:
+            self.sink.write(''.join(self.fragments))
+            self.fragments.clear()
+
+
+def emit_to_string(emit, *args):
+    sink = io.StringIO()
+    with Emitter(sink) as out:
+        emit(out, *args)
+    return sink.getvalue()
@@ -0,0 +1,128 @@
+import re
+
+from .elements import *
+from .graph import CATEGORIES, DependencyGraph
+
+# depends expressions: feature and extension names joined by ',' for or and
+# '+' for and, grouped with parentheses.
+DEPENDS_TOKEN_PATTERN = re.compile(r'[(),+]|[^(),+\s]+')
+
+
+def version_number(version: str):
+    return tuple(int(n) for n in version.split('.'))
+
+
+def depends_term(tokens: list, i: int, names: set):
+    if tokens[i] == '(':
+        value, i = depends_expression(tokens, i + 1, names)
+        assert tokens[i] == ')', 'Unbalanced depends expression'
+        return value, i + 1
+    return tokens[i] in names, i + 1
+
+
+def depends_expression(tokens: list, i: int, names: set):
+    # The registry gives ',' and '+' no precedence over each other, so
+    # they are applied left to right.
+    value, i = depends_term(tokens, i, names)
+    while i < len(tokens) and tokens[i] in (',', '+'):
+        operator = tokens[i]
+        operand, i = depends_term(tokens, i + 1, names)
+        value = (value or operand) if operator == ',' else \
+            (value and operand)
+    return value, i
+
+
+def depends_met(depends: str, names: set):
+    tokens = DEPENDS_TOKEN_PATTERN.findall(depends)
+    value, end = depends_expression(tokens, 0, names)
+    assert end == len(tokens), 'Invalid depends expression: ' + depends
+    return value
+
+
+def select_interfaces(elements: Elements, api_version: str,
+                      extension_names: list):
+    features = []
+    if api_version is not None:
+        version = version_number(api_version)
+        features = [f for f in elements.features
+                    if supports_vulkan(f.api) and
+                    version_number(f.number) <= version]
+
+    extension_names = set(extension_names or [])
+    extensions = [e for e in elements.extensions
+                  if e.name in extension_names]
+    unknown = extension_names - set(e.name for e in extensions)
+    assert not unknown, 'Unknown extensions: ' + ', '.join(sorted(unknown))
+    unsupported = [e.name for e in extensions
+                   if not supports_vulkan(e.supported)]
+    assert not unsupported, \
+        'Extensions not supported by Vulkan: ' + ', '.join(unsupported)
+
+    return features, extensions
+
+
+def selected_requires(interfaces: list):
+    # The interfaces themselves, plus their conditional <require> blocks
+    # whose depends hold for the selection.
+    names = set(interface.name for interface in interfaces)
+    requires = list(interfaces)
+    for interface in interfaces:
+        requires += [require for require in interface.requires
+                     if depends_met(require.depends, names)]
+    return requires
+
+
+def required_names(graph: DependencyGraph, requires: list):
+    names = []
+    for require in requires:
+        names += require.types + require.enums + require.commands
+
+    # Keep the requested aliases as well as what they point at.
+    required = graph.closure(names)
+    required.update(names)
+    return required
+
+
+def filter_elements(elements: Elements, api_version: str = None,
+                    extension_names: list = None,
+                    graph: DependencyGraph = None):
+    if api_version is None and not extension_names:
+        return elements
+
+    if graph is None:
+        graph = DependencyGraph(elements)
+
+    features, extensions = select_interfaces(
+        elements, api_version, extension_names)
+    requires = selected_requires(features + extensions)
+    required = required_names(graph, requires)
+
+    # Enum values that only come in through interfaces or <require> blocks
+    # that were not selected are dropped from their blocks.
+    all_enums = set()
+    for interface in elements.features + elements.extensions:
+        all_enums.update(interface.enums)
+        for require in interface.requires:
+            all_enums.update(require.enums)
+    selected_enums = set()
+    for require in requires:
+        selected_enums.update(require.enums)
+    excluded_enums = all_enums - selected_enums
+
+    filtered = Elements(features=features, extensions=extensions)
+    for category in CATEGORIES:
+        selected = getattr(filtered, category)
+        for element in getattr(elements, category):
+            if element.name not in required:
+                continue
+            if isinstance(element, Enums):
+                values = [e for e in element.enums
+                          if e.name not in excluded_enums]
+                element = Enums(element.name, values, element.bitmask,
+                                element.bitwidth)
+            selected.append(element)
+
+    filtered.aliases = dict((name, alias)
+                            for name, alias in elements.aliases.items()
+                            if name in required)
+    return filtered
@@ -0,0 +1,201 @@
+from .elements import *
+
+CATEGORIES = [
+    'constants',
+    'basetypes',
+    'handles',
+    'functionpointers',
+    'enums',
+    'structs',
+    'unions',
+    'commands',
+]
+
+
+def element_dependencies(element):
+    # (name, by_pointer) pairs. Only by-value dependencies need the other
+    # type to be complete, so only those can never be part of a cycle.
+    if isinstance(element, BaseType):
+        dependencies = []
+        if element.typedef:
+            dependencies.append((element.typedef, False))
+        if element.requires:
+            # The bits are only named by the FlagBits enum, the typedef
+            # itself does not need it.
+            dependencies.append((element.requires, True))
+        return dependencies
+    if isinstance(element, Handle):
+        return [(element.parent, True)] if element.parent else []
+    if isinstance(element, Constant):
+        return [(element.alias, False)] if element.alias else []
+    if isinstance(element, (FuncPointer, Command)):
+        return [(element.return_type.name, True)] + \
+            [(p.type_.name, True) for p in element.params]
+    if isinstance(element, (Struct, Union)):
+        dependencies = []
+        for m in element.members:
+            dependencies.append((m.type_.name, m.type_.pointers > 0))
+            dependencies += [(length, False) for length in m.type_.array]
+        return dependencies
+    return []
+
+
+def strongly_connected_components(nodes: list, edges: dict):
+    # Iterative Tarjan. Components come out dependencies first.
+    indices = {}
+    lowlinks = {}
+    stack = []
+    on_stack = set()
+    components = []
+
+    for root in nodes:
+        if root in indices:
+            continue
+
+        work = [(root, iter(edges[root]))]
+        indices[root] = lowlinks[root] = len(indices)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            descended = False
+            for successor in successors:
+                if successor not in indices:
+                    indices[successor] = lowlinks[successor] = len(indices)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(edges[successor])))
+                    descended = True
+                    break
+                if successor in on_stack:
+                    lowlinks[node] = min(lowlinks[node], indices[successor])
+            if descended:
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlinks[parent] = min(lowlinks[parent], lowlinks[node])
+
+            if lowlinks[node] == indices[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.remove(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+
+    return components
+
+
+class DependencyGraph:
+    def __init__(self, elements: Elements):
+        self.aliases = elements.aliases
+        self.elements = {}
+        for category in CATEGORIES:
+            for element in getattr(elements, category):
+                self.elements[element.name] = element
+
+        self.edges = {}
+        self.value_edges = {}
+        for name, element in self.elements.items():
+            edges = []
+            value_edges = []
+            for dependency, by_pointer in element_dependencies(element):
+                dependency = self.resolve(dependency)
+                if dependency is None or dependency in edges:
+                    continue
+                edges.append(dependency)
+                if not by_pointer:
+                    value_edges.append(dependency)
+            self.edges[name] = edges
+            self.value_edges[name] = value_edges
+
+        names = list(self.elements)
+        position = dict((name, i) for i, name in enumerate(names))
+        self.components = strongly_connected_components(names, self.edges)
+        self.component_of = {}
+        for i, component in enumerate(self.components):
+            for name in component:
+                self.component_of[name] = i
+
+        # A cycle is fine as long as it goes through a pointer somewhere.
+        self.cycles = []
+        for component in self.components:
+            if len(component) > 1 or component[0] in self.edges[component[0]]:
+                self.cycles.append(sorted(component, key=position.get))
+        for component in strongly_connected_components(
+                names, self.value_edges):
+            assert len(component) == 1 and \
+                component[0] not in self.value_edges[component[0]], \
+                'By-value dependency cycle: ' + ', '.join(component)
+
+        self.order = [name for component in self.components
+                      for name in sorted(component, key=position.get)]
+        self.closures = {}
+
+    def resolve(self, name: str):
+        seen = set()
+        while name not in self.elements:
+            if name not in self.aliases or name in seen:
+                return None
+            seen.add(name)
+            name = self.aliases[name]
+        return name
+
+    def dependencies(self, name: str):
+        return self.edges[self.resolve(name)]
+
+    def component_closure(self, index: int):
+        if index in self.closures:
+            return self.closures[index]
+
+        # Components are numbered dependencies first, so every component
+        # reachable from this one already has a lower index. Walking them in
+        # increasing order fills the memo without recursion.
+        pending = [index]
+        reachable = set()
+        while pending:
+            i = pending.pop()
+            if i in reachable:
+                continue
+            reachable.add(i)
+            if i in self.closures:
+                continue
+            for name in self.components[i]:
+                for dependency in self.edges[name]:
+                    pending.append(self.component_of[dependency])
+
+        for i in sorted(reachable):
+            if i in self.closures:
+                continue
+            closure = set(self.components[i])
+            for name in self.components[i]:
+                for dependency in self.edges[name]:
+                    j = self.component_of[dependency]
+                    if j != i:
+                        closure |= self.closures[j]
+            self.closures[i] = frozenset(closure)
+
+        return self.closures[index]
+
+    def closure(self, names):
+        if isinstance(names, str):
+            names = [names]
+
+        closure = set()
+        for name in names:
+            resolved = self.resolve(name)
+            if resolved is None:
+                continue
+            closure |= self.component_closure(self.component_of[resolved])
+        return closure
+
+    def ordered(self, elements: Elements):
+        present = {}
+        for category in CATEGORIES:
+            for element in getattr(elements, category):
+                present[element.name] = element
+        return [present[name] for name in self.order if name in present]
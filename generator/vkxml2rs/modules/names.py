@@ -0,0 +1,107 @@
+from .elements import *
+
+FNV_OFFSET = 0x811c9dc5
+FNV_PRIME = 0x01000193
+MASK = 0xffffffff
+# Average number of names sharing one displacement bucket.
+BUCKET_SIZE = 3
+# Names per table slot. The spare slots keep the last buckets from
+# searching for one of the few free slots left.
+LOAD_FACTOR = 0.8
+MAX_SEED = 1 << 20
+# Enums with at most this many names are looked up with a match instead of
+# a hash table.
+SMALL_TABLE = 16
+
+
+def fnv1a(name: str):
+    h = FNV_OFFSET
+    for b in name.encode():
+        h = ((h ^ b) * FNV_PRIME) & MASK
+    return h
+
+
+def fmix(h: int):
+    # Murmur3 finalizer, so that nearby seeds give unrelated slots.
+    h ^= h >> 16
+    h = (h * 0x85ebca6b) & MASK
+    h ^= h >> 13
+    h = (h * 0xc2b2ae35) & MASK
+    h ^= h >> 16
+    return h
+
+
+def perfect_hash(names: list):
+    # Hash and displace: names are grouped into buckets by one hash, then
+    # every bucket, largest first, searches for a seed that moves all of its
+    # names into free slots. Unused slots are None.
+    hashes = [fnv1a(name) for name in names]
+    assert len(set(hashes)) == len(hashes), 'Name hash collision'
+
+    size = int(len(names) / LOAD_FACTOR) + 1
+    buckets = [[] for _ in range((len(names) + BUCKET_SIZE - 1) //
+                                 BUCKET_SIZE)]
+    for h in hashes:
+        buckets[fmix(h) % len(buckets)].append(h)
+
+    seeds = [0] * len(buckets)
+    slots = [None] * size
+    index = dict((h, i) for i, h in enumerate(hashes))
+    order = sorted(range(len(buckets)), key=lambda b: -len(buckets[b]))
+    for b in order:
+        bucket = buckets[b]
+        if not bucket:
+            break
+        for seed in range(1, MAX_SEED):
+            placed = []
+            for h in bucket:
+                slot = fmix(h ^ seed) % size
+                if slots[slot] is not None or slot in placed:
+                    break
+                placed.append(slot)
+            else:
+                break
+        else:
+            assert False, 'No perfect hash seed for ' + names[index[bucket[0]]]
+        seeds[b] = seed
+        for h, slot in zip(bucket, placed):
+            slots[slot] = index[h]
+    return seeds, slots
+
+
+def canonical_names(enums: Enums):
+    # Aliases share the value of their target, so a value is named after the
+    # first value declared without an alias.
+    names = {}
+    for e in enums.enums:
+        if e.value is None:
+            continue
+        if e.value not in names or \
+                (e.alias is None and names[e.value][1] is not None):
+            names[e.value] = (e.name, e.alias)
+    return sorted((value, name) for value, (name, alias) in names.items())
+
+
+def enum_names(enums: Enums):
+    # Tables are kept on their Enums, so a parse cache written after they
+    # were built holds them too.
+    if enums.names is None:
+        entries = [(e.name, e.value) for e in enums.enums
+                   if e.value is not None]
+        if len(entries) > SMALL_TABLE:
+            seeds, slots = perfect_hash([name for name, value in entries])
+            entries = [entries[i] if i is not None else None for i in slots]
+        else:
+            seeds = []
+        if entries:
+            enums.names = EnumNames(enums.name, enums.repr_type(),
+                                    canonical_names(enums), seeds, entries)
+    return enums.names
+
+
+def enum_name_tables(elements: Elements):
+    tables = [table for table in map(enum_names, elements.enums)
+              if table is not None]
+    if tables:
+        tables.insert(0, NameHash())
+    return tables
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import List
+
+from .emit import Emitter
+
+MANIFEST_NAME = '.vkxml2rs-manifest.json'
+
+
+class HashingSink:
+    def __init__(self, file):
+        self.file = file
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, text: str):
+        data = text.encode('utf-8')
+        self.sha256.update(data)
+        self.file.write(data)
+        self.size += len(data)
+
+
+@dataclass
+class OutputReport:
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    bytes_generated: int = 0
+    bytes_written: int = 0
+
+    def is_modified(self):
+        return bool(self.added or self.changed or self.removed)
+
+
+class OutputTree:
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.manifest = self.load_manifest()
+        self.hashes = {}
+        self.report = OutputReport()
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.out_dir, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(manifest, dict):
+            return {}
+        return manifest
+
+    def save_manifest(self):
+        path = os.path.join(self.out_dir, MANIFEST_NAME)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.hashes, f, indent=1, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, path)
+
+    def is_up_to_date(self, path: str, full_path: str, tmp_path: str,
+                      digest: str):
+        if not os.path.exists(full_path):
+            return False
+        if path in self.manifest:
+            return self.manifest[path] == digest
+
+        # No manifest entry yet, e.g. on the first run after an upgrade, so
+        # fall back to comparing against what is on disk.
+        with open(full_path, 'rb') as f, open(tmp_path, 'rb') as g:
+            return f.read() == g.read()
+
+    @contextmanager
+    def open(self, path: str):
+        # Streams into a temporary file while hashing, then either moves it
+        # into place or drops it when the content did not change.
+        full_path = os.path.join(self.out_dir, path)
+        tmp_path = full_path + '.tmp'
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        sink = HashingSink(open(tmp_path, 'wb'))
+        try:
+            with Emitter(sink) as out:
+                yield out
+        except BaseException:
+            sink.file.close()
+            os.remove(tmp_path)
+            raise
+        sink.file.close()
+
+        digest = sink.sha256.hexdigest()
+        self.hashes[path] = digest
+        self.report.bytes_generated += sink.size
+        if self.is_up_to_date(path, full_path, tmp_path, digest):
+            os.remove(tmp_path)
+            self.report.unchanged.append(path)
+            return
+
+        if os.path.exists(full_path):
+            self.report.changed.append(path)
+        else:
+            self.report.added.append(path)
+        self.report.bytes_written += sink.size
+        os.replace(tmp_path, full_path)
+
+    def write(self, path: str, content: str):
+        with self.open(path) as out:
+            out.write(content)
+
+    def finish(self):
+        for path in sorted(self.manifest):
+            if path in self.hashes:
+                continue
+            full_path = os.path.join(self.out_dir, path)
+            if os.path.exists(full_path):
+                os.remove(full_path)
+            self.report.removed.append(path)
+
+        if self.hashes != self.manifest:
+            os.makedirs(self.out_dir, exist_ok=True)
+            self.save_manifest()
+
+        return self.report
+
+
+def write_outputs(out_dir: str, outputs: dict):
+    # Values are either rendered strings or functions emitting into an
+    # Emitter.
+    tree = OutputTree(out_dir)
+    for path, content in outputs.items():
+        if isinstance(content, str):
+            tree.write(path, content)
+        else:
+            with tree.open(path) as out:
+                content(out)
+    return tree.finish()
@@ -1,66 +1,278 @@
+import dataclasses
+import io
+import mmap
+import re
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 
 from .elements import *
+from .symbols import resolve_aliases
 
 
-def parse_vk_xml(xml_path: str):
-    tree = ET.parse(xml_path)
-    root = tree.getroot()
+EXTENSION_ENUM_BASE = 1000000000
+EXTENSION_ENUM_BLOCK_SIZE = 1000
 
+ARRAY_PATTERN = re.compile(r'\[\s*(\d+)\s*\]')
+# C integer literal suffixes, as in 0ULL.
+INT_SUFFIX_PATTERN = re.compile(r'[uUlL]+$')
+
+# Top level registry sections that can be parsed independently of each
+# other. None of them nest, so matching their tags is enough to find them.
+SECTION_PATTERN = re.compile(
+    rb'<!--.*?-->|<(/?)(types|enums|commands|feature|extensions)\b[^>]*?(/?)>',
+    re.DOTALL)
+
+# Sections large enough to be split between workers, and the start of the
+# children they can be split in front of. Only top level <type> tags carry
+# attributes, member and parameter types never do.
+SPLIT_PATTERNS = {
+    b'types': re.compile(rb'<type\s'),
+    b'commands': re.compile(rb'<command\b'),
+    b'extensions': re.compile(rb'<extension\b'),
+}
+SECTION_TAG_PATTERN = re.compile(rb'<(\w+)[^>]*?(/?)>')
+# Pieces per worker, so that workers finishing early pick up more.
+PIECES_PER_JOB = 4
+MIN_PIECE_SIZE = 1 << 16
+
+
+def parse_vk_xml(xml_path: str, jobs: int = 1):
+    if jobs > 1:
+        return parse_vk_xml_parallel(xml_path, jobs)
+
+    elements = Elements()
+    # Enum values contributed by features and extensions, keyed by the name
+    # of the enum block they extend.
+    pending = {}
+    parse_registry(xml_path, elements, pending)
+
+    merge_extension_enums(elements, pending)
+    resolve_aliases(elements)
+    return elements
+
+
+def parse_registry(source, elements: Elements, pending: dict):
+    # Walk the registry incrementally and hand every finished top level node
+    # (or child of a top level section) to its parser, then drop it from the
+    # partial tree so that memory use does not grow with the registry size.
+    stack = []
+    for event, node in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            stack.append(node)
+            continue
+
+        stack.pop()
+        depth = len(stack)
+        if depth == 1:
+            if node.tag == 'enums':
+                enums = parse_enums(node)
+                if enums is not None:
+                    elements.enums.append(enums)
+                else:
+                    elements.constants += parse_constants(node)
+            elif node.tag == 'feature':
+                elements.features.append(parse_feature(node, pending))
+            stack[0].remove(node)
+        elif depth == 2:
+            section = stack[1].tag
+            if section == 'types':
+                if node.tag == 'type':
+                    parse_type(node, elements)
+                stack[1].remove(node)
+            elif section == 'commands':
+                if node.tag == 'command':
+                    command = parse_command(node, elements)
+                    if command is not None:
+                        elements.commands.append(command)
+                stack[1].remove(node)
+            elif section == 'extensions':
+                if node.tag == 'extension':
+                    extension = parse_extension(node, pending)
+                    elements.extensions.append(extension)
+                stack[1].remove(node)
+
+    return elements
+
+
+def registry_sections(data: bytes):
+    sections = []
+    start = None
+    for match in SECTION_PATTERN.finditer(data):
+        if match.group(2) is None:
+            continue
+        if match.group(1):
+            sections.append((start, match.end()))
+            start = None
+        elif match.group(3):
+            sections.append((match.start(), match.end()))
+        elif start is None:
+            start = match.start()
+
+    return sections
+
+
+def wrap_section(data: bytes, tag: bytes = None):
+    if tag is None:
+        return data
+    return b'<' + tag + b'>' + data + b'</' + tag + b'>'
+
+
+def parse_section(data: bytes):
     elements = Elements()
-    for child in root:
-        if child.tag == 'types':
-            parse_types(child, elements)
+    pending = {}
+    source = io.BytesIO(b'<registry>' + data + b'</registry>')
+    parse_registry(source, elements, pending)
+    return elements, pending
+
+
+def merge_elements(elements: Elements, pending: dict, section: Elements,
+                   section_pending: dict):
+    for category in dataclasses.fields(Elements):
+        value = getattr(section, category.name)
+        if isinstance(value, dict):
+            getattr(elements, category.name).update(value)
+        else:
+            getattr(elements, category.name).extend(value)
+
+    for name, values in section_pending.items():
+        pending.setdefault(name, []).extend(values)
+
+
+def split_points(data, start: int, end: int, pattern, size: int):
+    points = []
+    position = start + size
+    while position < end:
+        match = pattern.search(data, position, end)
+        if match is None:
+            break
+        split = match.start()
+        # Never split inside a comment.
+        comment = data.rfind(b'<!--', start, split)
+        if comment > data.rfind(b'-->', start, split):
+            position = data.find(b'-->', split, end)
+            if position < 0:
+                break
+            continue
+        points.append(split)
+        position = split + size
+    return points
+
+
+def section_pieces(data, jobs: int, min_piece_size: int = MIN_PIECE_SIZE):
+    # Byte ranges of the registry to parse, in document order, each with the
+    # section tag it has to be wrapped in. Whole sections are not wrapped.
+    size = max(min_piece_size, len(data) // (jobs * PIECES_PER_JOB))
+    pieces = []
+    for start, end in registry_sections(data):
+        match = SECTION_TAG_PATTERN.match(data, start, end)
+        tag = match.group(1)
+        pattern = SPLIT_PATTERNS.get(tag)
+        if pattern is None or match.group(2) or end - start <= size:
+            pieces.append((start, end, None))
+            continue
+
+        content_start = match.end()
+        content_end = data.rfind(b'</', start, end)
+        points = split_points(data, content_start, content_end, pattern,
+                              size)
+        bounds = [content_start] + points + [content_end]
+        for i in range(len(bounds) - 1):
+            pieces.append((bounds[i], bounds[i + 1], tag))
+    return pieces
+
+
+# The registry mapped into every parse worker, so that tasks only carry byte
+# ranges instead of the bytes themselves.
+worker_data = None
+
+
+def map_registry(xml_path: str):
+    with open(xml_path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def init_worker(xml_path: str):
+    global worker_data
+    worker_data = map_registry(xml_path)
+
+
+def parse_piece(piece: tuple):
+    start, end, tag = piece
+    return parse_section(wrap_section(worker_data[start:end], tag))
+
+
+def parse_vk_xml_parallel(xml_path: str, jobs: int):
+    data = map_registry(xml_path)
+    try:
+        pieces = section_pieces(data, jobs)
+    finally:
+        data.close()
+
+    # Pieces are merged back in document order, so the result is the same
+    # as parsing the file in one pass.
+    elements = Elements()
+    pending = {}
+    with ProcessPoolExecutor(jobs, initializer=init_worker,
+                             initargs=(xml_path,)) as executor:
+        for section, section_pending in executor.map(parse_piece, pieces):
+            merge_elements(elements, pending, section, section_pending)
+
+    merge_extension_enums(elements, pending)
+    resolve_aliases(elements)
+    return elements
 
 
 def parse_basetype(node: ET.Element):
-    typedef = node[0].text
-    name = node[1].text
-    return BaseType(name, typedef)
+    typedef = node.findtext('type')
+    name = node.findtext('name')
+    return BaseType(name, typedef,
+                    node.get('requires') or node.get('bitvalues'))
 
 
 def parse_handle(node: ET.Element):
-    name = node[1].text
-    return Handle(name)
+    name = node.findtext('name')
+    return Handle(name, node.get('parent'))
 
 
 def parse_funcpointer(node: ET.Element):
     name = node[0].text
-    return_type = node.text.split()[1]
+    # "typedef void* (VKAPI_PTR *": the return type sits between typedef and
+    # the opening parenthesis.
+    return_decl = node.text.split('(')[0].split()[1:]
+    return_type = TypeRef(' '.join(w.rstrip('*') for w in return_decl
+                                   if w not in ('const', '*')),
+                          'const' in return_decl,
+                          ''.join(return_decl).count('*'))
     name_tail = node[0].tail.split()
-    is_const = False
-    is_pointer = False
-    if len(name_tail) > 0 and name_tail[-1] == 'const':
-        is_const = True
+    is_const = len(name_tail) > 0 and name_tail[-1] == 'const'
 
     params = []
     for e in node.iter('type'):
         if e.get('category') == 'funcpointer':
             continue
-        param_type = e.text
         tails = e.tail.split()
-        if tails[0] == '*':
-            is_pointer = True
-            param_name = tails[1]
-        else:
-            is_pointer = False
-            param_name = tails[0]
+        pointers = 0
+        while tails[0].startswith('*'):
+            pointers += tails[0].count('*')
+            tails[0] = tails[0].lstrip('*')
+            if not tails[0]:
+                tails.pop(0)
+        param_name = tails[0]
         param_name = param_name.replace(',', '')
         param_name = param_name.replace(')', '')
         param_name = param_name.replace(';', '')
 
-        if is_pointer:
-            if is_const:
-                param_type = 'const ' + param_type + ' *'
-            else:
-                param_type = param_type + ' *'
-        param = Param(param_type, param_name)
-        params.append(param)
+        params.append(Param(TypeRef(e.text, is_const and pointers > 0,
+                                    pointers), param_name))
         is_const = tails[-1] == 'const'
 
     return FuncPointer(name, return_type, params)
 
 
+def parse_int(value: str):
+    return int(INT_SUFFIX_PATTERN.sub('', value), 0)
+
+
 def parse_enums(node: ET.Element):
     name = node.attrib['name']
     if not node.attrib.get('type'):
@@ -68,56 +280,153 @@ def parse_enums(node: ET.Element):
 
     enum_type = node.attrib['type']
     enums = []
-    for child in node.getchildren():
+    values = {}
+    for child in node:
+        if child.tag != 'enum':
+            continue
         enum_name = child.attrib['name']
-        if child.attrib.get('alias'):
-            alias_name = child.attrib['alias']
-            aliases = list(filter(lambda x: x.name == alias_name, enums))
-            assert len(aliases) > 0
-            enum_value = aliases[0].value
+        alias_name = child.attrib.get('alias')
+        if alias_name:
+            # Forward aliases and aliases into other blocks are left for
+            # resolve_aliases once the whole registry has been parsed.
+            enum_value = values.get(alias_name)
         else:
-            if enum_type == 'enum':
-                enum_value = int(child.attrib['value'])
+            if child.attrib.get('value'):
+                enum_value = parse_int(child.attrib['value'])
             elif enum_type == 'bitmask':
                 enum_value = 1 << int(child.attrib['bitpos'])
             else:
                 assert False, 'Unknown type.'
-        enums.append(Enum(enum_name, enum_value))
+        values[enum_name] = enum_value
+        enums.append(Enum(enum_name, enum_value, alias_name))
+
+    return Enums(name, enums, enum_type == 'bitmask',
+                 int(node.get('bitwidth', 32)))
+
+
+def parse_constants(node: ET.Element):
+    constants = []
+    values = {}
+    for child in node:
+        if child.tag != 'enum':
+            continue
+        name = child.attrib['name']
+        alias = child.get('alias')
+        if alias:
+            assert alias in values, 'Unknown alias: ' + alias
+            value, c_type = values[alias]
+        else:
+            value, c_type = child.attrib['value'], child.get('type')
+        values[name] = value, c_type
+        constants.append(Constant(name, value, alias, c_type))
+
+    return constants
+
+
+def parse_array(tail: str, node: ET.Element):
+    # Lengths follow the name either as literals, "[4]", or as API
+    # constants, "[<enum>VK_UUID_SIZE</enum>]".
+    lengths = ARRAY_PATTERN.findall(tail or '')
+    for child in node.iter('enum'):
+        lengths.append(child.text)
+    return tuple(lengths)
 
-    return Enums(name, enums)
+
+def parse_optional(node: ET.Element):
+    optional = node.get('optional')
+    if not optional:
+        return ()
+    return tuple(flag == 'true' for flag in optional.split(','))
+
+
+def parse_member(node: ET.Element):
+    is_const = False
+    if node.text is not None:
+        words = node.text.split()
+        is_const = len(words) > 0 and words[0] == 'const'
+
+    type_node = node.find('type')
+    pointers = 0
+    if type_node.tail is not None:
+        pointers = type_node.tail.count('*')
+
+    name_node = node.find('name')
+    array = parse_array(name_node.tail, node)
+
+    return name_node.text, TypeRef(type_node.text, is_const, pointers, array)
 
 
 def parse_struct(node: ET.Element):
     name = node.attrib['name']
     members = []
-    for child in node.getchildren():
+    s_type = None
+    for child in node:
         if child.tag != 'member':
             continue
 
-        is_const = False
-        if child.text is not None:
-            words = child.text.split()
-            is_const = len(words) > 0 and words[0] == 'const'
+        member_name, member_type = parse_member(child)
+        members.append(Member(member_name, member_type, child.get('len'),
+                              parse_optional(child)))
+        if member_name == 'sType' and child.get('values'):
+            s_type = child.attrib['values'].split(',')[0]
 
-        member_type = child[0].text
+    extends = node.get('structextends')
+    return Struct(name, members, s_type,
+                  extends.split(',') if extends else [])
 
-        is_pointer = False
-        if child[0].tail is not None:
-            words = child[0].tail.split()
-            is_pointer = len(words) > 0 and words[0] == '*'
 
-        member_name = child[1].text
+def parse_union(node: ET.Element):
+    struct = parse_struct(node)
+    return Union(struct.name, struct.members)
 
-        if is_pointer:
-            if is_const:
-                member_type = 'const ' + member_type + ' *'
-            else:
-                member_type = member_type + ' *'
 
-        member = Member(member_name, member_type)
-        members.append(member)
+def parse_command(node: ET.Element, elements: Elements):
+    proto = node.find('proto')
+    if proto is None:
+        if node.get('alias'):
+            elements.aliases[node.attrib['name']] = node.attrib['alias']
+        return None
 
-    return Struct(name, members)
+    name, return_type = parse_member(proto)
+    params = []
+    for child in node:
+        if child.tag != 'param':
+            continue
+
+        param_name, param_type = parse_member(child)
+        params.append(Param(param_type, param_name, child.get('len'),
+                            parse_optional(child)))
+
+    return Command(name, return_type, params)
+
+
+def parse_type(node: ET.Element, elements: Elements):
+    if node.get('alias'):
+        elements.aliases[node.attrib['name']] = node.attrib['alias']
+        return elements
+
+    category = node.attrib.get('category')
+    if category == 'basetype' or category == 'bitmask':
+        basetype = parse_basetype(node)
+        elements.basetypes.append(basetype)
+
+    elif category == 'handle':
+        handle = parse_handle(node)
+        elements.handles.append(handle)
+
+    elif category == 'funcpointer':
+        funcpointer = parse_funcpointer(node)
+        elements.functionpointers.append(funcpointer)
+
+    elif category == 'struct':
+        struct = parse_struct(node)
+        elements.structs.append(struct)
+
+    elif category == 'union':
+        union = parse_union(node)
+        elements.unions.append(union)
+
+    return elements
 
 
 def parse_types(node: ET.Element, elements: Elements):
@@ -125,17 +434,102 @@ def parse_types(node: ET.Element, elements: Elements):
         if child.tag != 'type':
             continue
 
-        category = child.attrib.get('category')
-        if category == 'basetype':
-            basetype = parse_basetype(child)
-            elements.basetypes.append(basetype)
+        parse_type(child, elements)
+
+    return elements
+
 
-        elif category == 'handle':
-            handle = parse_handle(child)
-            elements.handles.append(handle)
+def parse_extension_enum(node: ET.Element, extnumber: int):
+    name = node.attrib['name']
+    if node.get('alias'):
+        return Enum(name, None, node.attrib['alias'])
+
+    if node.get('offset'):
+        extnumber = int(node.get('extnumber', extnumber))
+        value = (EXTENSION_ENUM_BASE
+                 + (extnumber - 1) * EXTENSION_ENUM_BLOCK_SIZE
+                 + int(node.attrib['offset']))
+        if node.get('dir') == '-':
+            value = -value
+    elif node.get('bitpos'):
+        value = 1 << int(node.attrib['bitpos'])
+    else:
+        value = parse_int(node.attrib['value'])
+
+    return Enum(name, value)
+
+
+def require_depends(node: ET.Element):
+    # Older registries name the feature or extension a block depends on in
+    # their own attributes.
+    depends = [node.get(name) for name in ('depends', 'feature', 'extension')
+               if node.get(name)]
+    if len(depends) > 1:
+        return '+'.join('(' + d + ')' for d in depends)
+    return depends[0] if depends else None
+
+
+def parse_require(node: ET.Element, interface, extnumber, pending: dict):
+    for require in node:
+        if require.tag != 'require':
+            continue
+        if not supports_vulkan(require.get('api', 'vulkan')):
+            continue
+
+        target = interface
+        depends = require_depends(require)
+        if depends is not None:
+            target = Require(depends)
+            interface.requires.append(target)
+
+        for child in require:
+            name = child.get('name')
+            if child.tag == 'type':
+                target.types.append(name)
+            elif child.tag == 'command':
+                target.commands.append(name)
+            elif child.tag == 'enum':
+                target.enums.append(name)
+                extends = child.get('extends')
+                if extends and pending is not None:
+                    enum = parse_extension_enum(child, extnumber)
+                    pending.setdefault(extends, []).append(enum)
+
+    return interface
+
+
+def parse_feature(node: ET.Element, pending: dict):
+    feature = Feature(node.attrib['name'], node.attrib['number'],
+                      api=node.get('api', 'vulkan'))
+    if not supports_vulkan(feature.api):
+        pending = None
+    return parse_require(node, feature, None, pending)
+
+
+def parse_extension(node: ET.Element, pending: dict):
+    extension = Extension(node.attrib['name'],
+                          int(node.attrib['number']),
+                          node.get('supported', 'vulkan'))
+    # Values of disabled extensions and of other APIs never reach the
+    # enum blocks.
+    if not supports_vulkan(extension.supported):
+        pending = None
+    return parse_require(node, extension, extension.number, pending)
+
+
+def merge_extension_enums(elements: Elements, pending: dict):
+    for enums in elements.enums:
+        extensions = pending.get(enums.name)
+        if extensions is None:
+            continue
 
-        elif category == 'funcpointer':
-            funcpointer = parse_funcpointer(child)
-            elements.functionpointers.append(funcpointer)
+        names = set(e.name for e in enums.enums)
+        for enum in extensions:
+            # Promoted values are required again by every later feature and
+            # extension that depends on them.
+            if enum.name in names:
+                continue
+            names.add(enum.name)
+            enums.enums.append(enum)
 
     return elements
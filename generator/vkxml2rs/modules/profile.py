@@ -0,0 +1,116 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from .elements import *
+
+
+def peak_memory_kb(who):
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+
+def element_counts(elements: Elements):
+    return {
+        'constants': len(elements.constants),
+        'basetypes': len(elements.basetypes),
+        'handles': len(elements.handles),
+        'functionpointers': len(elements.functionpointers),
+        'enums': len(elements.enums),
+        'enum_values': sum(len(e.enums) for e in elements.enums),
+        'structs': len(elements.structs),
+        'unions': len(elements.unions),
+        'commands': len(elements.commands),
+        'features': len(elements.features),
+        'extensions': len(elements.extensions),
+    }
+
+
+def alias_count(elements: Elements):
+    enum_aliases = sum(1 for enums in elements.enums
+                       for e in enums.enums if e.alias)
+    return enum_aliases + len(elements.aliases)
+
+
+class Profiler:
+    def __init__(self, top: int = 0):
+        self.top = top
+        self.phases = {}
+        self.metrics = {}
+        self.profile = cProfile.Profile() if top > 0 else None
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+
+    @contextmanager
+    def phase(self, name: str):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        if self.profile is not None:
+            self.profile.enable()
+        try:
+            yield
+        finally:
+            if self.profile is not None:
+                self.profile.disable()
+            phase = self.phases.setdefault(
+                name, {'wall_seconds': 0.0, 'cpu_seconds': 0.0})
+            phase['wall_seconds'] += time.perf_counter() - wall
+            phase['cpu_seconds'] += time.process_time() - cpu
+
+    def set(self, name: str, value):
+        self.metrics[name] = value
+
+    def hot_functions(self):
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        stats.sort_stats('tottime')
+        functions = []
+        for key in stats.fcn_list[:self.top]:
+            calls, primitive_calls, tottime, cumtime, callers = \
+                stats.stats[key]
+            filename, line, name = key
+            functions.append({
+                'function': name,
+                'file': filename,
+                'line': line,
+                'calls': calls,
+                'tottime': tottime,
+                'cumtime': cumtime,
+            })
+        return functions
+
+    def report(self):
+        report = {
+            'phases': self.phases,
+            'total': {
+                'wall_seconds': time.perf_counter() - self.start_wall,
+                'cpu_seconds': time.process_time() - self.start_cpu,
+            },
+        }
+        report.update(self.metrics)
+        if resource is not None:
+            report['peak_memory_kb'] = {
+                'self': peak_memory_kb(resource.RUSAGE_SELF),
+                'children': peak_memory_kb(resource.RUSAGE_CHILDREN),
+            }
+        if self.profile is not None:
+            report['hot_functions'] = self.hot_functions()
+        return report
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
@@ -0,0 +1,263 @@
+import re
+
+from .cache import cache_key, cache_path, default_cache_dir, read_cache
+from .elements import *
+from .parse import (merge_elements, merge_extension_enums, parse_section,
+                    registry_sections, wrap_section)
+from .symbols import SymbolIndex, resolve_aliases
+
+# Elements inside a top level section that can be looked up by name. Member
+# and parameter types nest <type> tags inside them, so the scan keeps track
+# of the depth.
+CHILD_PATTERN = re.compile(
+    rb'<!--.*?-->|<(/?)(type|command|extension)\b([^>]*?)(/?)>', re.DOTALL)
+TAG_PATTERN = re.compile(rb'<(\w+)([^>]*?)/?>')
+NAME_ATTRIBUTE = re.compile(rb'\bname="([^"]*)"')
+NAME_TEXT = re.compile(rb'<name>([^<]*)</name>')
+
+# Section tag -> tag of its named children. Other sections are named
+# elements themselves.
+SECTION_CHILDREN = {
+    b'types': b'type',
+    b'commands': b'command',
+    b'extensions': b'extension',
+}
+
+SECTION_PARENTS = dict((child, section)
+                       for section, child in SECTION_CHILDREN.items())
+
+# Sections holding each Elements category.
+CATEGORY_SECTIONS = {
+    'constants': [b'enums'],
+    'basetypes': [b'types'],
+    'handles': [b'types'],
+    'functionpointers': [b'types'],
+    'enums': [b'enums', b'feature', b'extensions'],
+    'structs': [b'types'],
+    'unions': [b'types'],
+    'commands': [b'commands'],
+    'features': [b'feature'],
+    'extensions': [b'extensions'],
+    'aliases': [b'types', b'commands'],
+}
+
+CATEGORY_TYPES = {
+    'basetypes': BaseType,
+    'handles': Handle,
+    'functionpointers': FuncPointer,
+    'structs': Struct,
+    'unions': Union,
+    'commands': Command,
+    'features': Feature,
+    'extensions': Extension,
+}
+
+
+def element_name(data: bytes, start: int, end: int, attributes: bytes):
+    match = NAME_ATTRIBUTE.search(attributes)
+    if match is None:
+        # Handles, base types and function pointers, and commands, name
+        # themselves in their first <name> child.
+        match = NAME_TEXT.search(data, start, end)
+    if match is None:
+        return None
+    return match.group(1).decode()
+
+
+def index_section(data: bytes, start: int, end: int, tag: bytes, index: dict):
+    child_tag = SECTION_CHILDREN[tag]
+    depth = 0
+    child_start = None
+    child_attributes = None
+    for match in CHILD_PATTERN.finditer(data, start, end):
+        if match.group(2) is None:
+            continue
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                name = element_name(data, child_start, match.end(),
+                                    child_attributes)
+                index[(child_tag, name)] = (tag, child_start, match.end())
+        elif match.group(4):
+            if depth == 0 and match.group(2) == child_tag:
+                name = element_name(data, match.start(), match.end(),
+                                    match.group(3))
+                index[(child_tag, name)] = (tag, match.start(), match.end())
+        else:
+            if depth == 0:
+                child_start = match.start()
+                child_attributes = match.group(3)
+            depth += 1
+
+
+def registry_section_tags(data: bytes):
+    # Maps every top level section tag to the byte ranges of its sections.
+    sections = {}
+    for start, end in registry_sections(data):
+        tag = TAG_PATTERN.match(data, start, end).group(1)
+        sections.setdefault(tag, []).append((start, end))
+    return sections
+
+
+def index_sections(data: bytes, tag: bytes, sections: list):
+    # Maps the name of every element of one section tag to its byte range
+    # and the tag of the section it has to be wrapped in to be parsed.
+    index = {}
+    for start, end in sections:
+        if tag in SECTION_CHILDREN:
+            index_section(data, start, end, tag, index)
+        else:
+            match = TAG_PATTERN.match(data, start, end)
+            name = element_name(data, start, match.end(), match.group(2))
+            index[(tag, name)] = (None, start, end)
+    return index
+
+
+class Registry:
+    # Answers queries about single registry elements, parsing only what they
+    # need and remembering it. With a valid parse cache, every query is
+    # answered from the cached elements instead.
+    def __init__(self, xml_path: str, cache_dir: str = None):
+        if cache_dir is None:
+            cache_dir = default_cache_dir()
+
+        self.xml_path = xml_path
+        self.elements = read_cache(cache_path(xml_path, cache_dir),
+                                   cache_key(xml_path))
+        self.symbols = None
+        self.interfaces = None
+        self.parsed = {}
+        self.categories = {}
+        if self.elements is None:
+            with open(xml_path, 'rb') as f:
+                self.data = f.read()
+            self.sections = registry_section_tags(self.data)
+            self.index = {}
+            self.indexed = set()
+        else:
+            self.index_elements()
+
+    def index_elements(self):
+        # The symbol index only holds types, enums and commands.
+        self.symbols = SymbolIndex(self.elements)
+        self.interfaces = dict(
+            (interface.name, interface)
+            for interface in self.elements.features + self.elements.extensions)
+
+    def index_tag(self, tag: bytes):
+        # Sections are only scanned for their elements once one of them is
+        # asked for.
+        section_tag = SECTION_PARENTS.get(tag, tag)
+        if section_tag not in self.indexed:
+            self.indexed.add(section_tag)
+            self.index.update(index_sections(
+                self.data, section_tag, self.sections.get(section_tag, [])))
+
+    def parse_element(self, tag: bytes, name: str):
+        key = (tag, name)
+        if key not in self.parsed:
+            self.index_tag(tag)
+            entry = self.index.get(key)
+            if entry is None:
+                self.parsed[key] = None
+            else:
+                section, start, end = entry
+                self.parsed[key] = parse_section(
+                    wrap_section(self.data[start:end], section))[0]
+        return self.parsed[key]
+
+    def find(self, tag: bytes, name: str, category: str):
+        if self.symbols is not None:
+            if category in ('features', 'extensions'):
+                element = self.interfaces.get(name)
+            else:
+                element = self.symbols.lookup(name)
+            if not isinstance(element, CATEGORY_TYPES[category]):
+                return None
+            return element
+
+        seen = set()
+        while name is not None and name not in seen:
+            seen.add(name)
+            fragment = self.parse_element(tag, name)
+            if fragment is None:
+                return None
+            found = getattr(fragment, category)
+            if found:
+                return found[0]
+            name = fragment.aliases.get(name)
+        return None
+
+    def basetype(self, name: str):
+        return self.find(b'type', name, 'basetypes')
+
+    def handle(self, name: str):
+        return self.find(b'type', name, 'handles')
+
+    def funcpointer(self, name: str):
+        return self.find(b'type', name, 'functionpointers')
+
+    def struct(self, name: str):
+        return self.find(b'type', name, 'structs')
+
+    def union(self, name: str):
+        return self.find(b'type', name, 'unions')
+
+    def command(self, name: str):
+        return self.find(b'command', name, 'commands')
+
+    def extension(self, name: str):
+        return self.find(b'extension', name, 'extensions')
+
+    def feature(self, name: str):
+        return self.find(b'feature', name, 'features')
+
+    def parse_sections(self, tag: bytes):
+        if tag not in self.parsed:
+            elements = Elements()
+            pending = {}
+            for start, end in self.sections.get(tag, []):
+                merge_elements(elements, pending,
+                               *parse_section(self.data[start:end]))
+            self.parsed[tag] = elements, pending
+        return self.parsed[tag]
+
+    def category(self, name: str):
+        if self.elements is not None:
+            return getattr(self.elements, name)
+
+        if name not in self.categories:
+            elements = Elements()
+            pending = {}
+            for tag in CATEGORY_SECTIONS[name]:
+                merge_elements(elements, pending, *self.parse_sections(tag))
+            if name == 'enums':
+                # Enum values depend on every feature and extension that
+                # adds to them.
+                merge_extension_enums(elements, pending)
+                resolve_aliases(elements)
+            self.categories[name] = getattr(elements, name)
+        return self.categories[name]
+
+    def enums(self, name: str):
+        for enums in self.category('enums'):
+            if enums.name == name:
+                return enums
+        target = self.category('aliases').get(name)
+        if target is not None and target != name:
+            return self.enums(target)
+        return None
+
+    def constant(self, name: str):
+        for constant in self.category('constants'):
+            if constant.name == name:
+                return constant
+        return None
+
+    def load(self):
+        if self.elements is None:
+            self.elements = Elements(**dict(
+                (category, self.category(category))
+                for category in CATEGORY_SECTIONS))
+            self.index_elements()
+        return self.elements
@@ -0,0 +1,180 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .chain import structure_chains
+from .dispatch import dispatch_tables
+from .elements import *
+from .emit import emit_to_string
+from .graph import DependencyGraph
+from .names import enum_name_tables
+
+HEADER = '// This file is generated by vkxml2rs. Do not edit.\n\n'
+COMMON_MODULE = 'common'
+EXTENSIONS_MODULE = 'extensions'
+DISPATCH_MODULE = 'dispatch'
+CHAIN_MODULE = 'chain'
+NAMES_MODULE = 'names'
+
+# Sharded output directories and the element categories they hold.
+SHARDS = [
+    ('types', ['basetypes', 'handles', 'functionpointers']),
+    ('enums', ['constants', 'enums']),
+    ('structs', ['structs', 'unions']),
+    ('commands', ['commands']),
+]
+
+
+def emit_elements(out, elements: list):
+    out.write(HEADER, 'use std::os::raw::*;\n\n')
+    for element in elements:
+        element.emit(out)
+
+
+def single_outputs(elements: Elements, graph: DependencyGraph = None):
+    if graph is None:
+        graph = DependencyGraph(elements)
+
+    ordered = graph.ordered(elements) + enum_name_tables(elements) + \
+        structure_chains(elements) + dispatch_tables(elements)
+    return {'vk.rs': partial(emit_elements, elements=ordered)}
+
+
+def render(outputs: dict, jobs: int = 1):
+    if jobs > 1 and len(outputs) > 1:
+        # map keeps the submission order, so the rendered outputs do not
+        # depend on which worker finishes first.
+        with ProcessPoolExecutor(jobs) as executor:
+            contents = executor.map(emit_to_string, outputs.values())
+            return dict(zip(outputs, contents))
+
+    return dict((path, emit_to_string(emit))
+                for path, emit in outputs.items())
+
+
+def render_outputs(elements: Elements, graph: DependencyGraph = None):
+    return render(single_outputs(elements, graph))
+
+
+def module_name(name: str):
+    return name.lower()
+
+
+def element_owners(elements: Elements):
+    # Every element lives in the module of the first feature that requires
+    # it, otherwise in the first extension that does.
+    owners = {}
+    interfaces = [f for f in elements.features if supports_vulkan(f.api)]
+    interfaces += [e for e in elements.extensions
+                   if supports_vulkan(e.supported)]
+    for interface in interfaces:
+        for name in interface_names(interface):
+            owners.setdefault(name, module_name(interface.name))
+
+    return owners
+
+
+def module_order(elements: Elements):
+    modules = [module_name(f.name) for f in elements.features]
+    modules += [module_name(e.name) for e in elements.extensions]
+    modules.append(COMMON_MODULE)
+    return dict((module, i) for i, module in enumerate(modules))
+
+
+def emit_shard(out, shard: list):
+    out.write(HEADER,
+              'use std::os::raw::*;\n',
+              'use super::super::*;\n\n')
+    for element in shard:
+        element.emit(out)
+
+
+def emit_toplevel(out, elements: list):
+    out.write(HEADER,
+              'use std::os::raw::*;\n',
+              'use super::*;\n\n')
+    for element in elements:
+        element.emit(out)
+
+
+def emit_mod(out, modules: list, public: bool = False):
+    out.write(HEADER)
+    for module in modules:
+        if public:
+            out.write('pub ')
+        out.write('mod ', module, ';\n')
+
+    out.write('\n')
+    for module in modules:
+        out.write('pub use self::', module, '::*;\n')
+
+
+def sharded_outputs(elements: Elements, graph: DependencyGraph = None):
+    if graph is None:
+        graph = DependencyGraph(elements)
+
+    ordered = graph.ordered(elements)
+    owners = element_owners(elements)
+    order = module_order(elements)
+    extension_names = set(module_name(e.name) for e in elements.extensions)
+
+    outputs = {}
+    directories = []
+    extension_shards = {}
+    for directory, categories in SHARDS:
+        names = set(element.name for category in categories
+                    for element in getattr(elements, category))
+        shards = {}
+        for element in ordered:
+            if element.name not in names:
+                continue
+            owner = owners.get(element.name, COMMON_MODULE)
+            if owner in extension_names:
+                extension_shards.setdefault(owner, []).append(element)
+            else:
+                shards.setdefault(owner, []).append(element)
+
+        if not shards:
+            continue
+
+        directories.append(directory)
+        modules = sorted(shards, key=order.get)
+        for module in modules:
+            path = directory + '/' + module + '.rs'
+            outputs[path] = partial(emit_shard, shard=shards[module])
+        outputs[directory + '/mod.rs'] = partial(emit_mod, modules=modules)
+
+    if extension_shards:
+        directories.append(EXTENSIONS_MODULE)
+        modules = sorted(extension_shards, key=order.get)
+        for module in modules:
+            path = EXTENSIONS_MODULE + '/' + module + '.rs'
+            outputs[path] = partial(emit_shard,
+                                    shard=extension_shards[module])
+        outputs[EXTENSIONS_MODULE + '/mod.rs'] = partial(
+            emit_mod, modules=modules, public=True)
+
+    names = enum_name_tables(elements)
+    if names:
+        directories.append(NAMES_MODULE)
+        outputs[NAMES_MODULE + '.rs'] = partial(emit_toplevel,
+                                                elements=names)
+
+    chains = structure_chains(elements)
+    if chains:
+        directories.append(CHAIN_MODULE)
+        outputs[CHAIN_MODULE + '.rs'] = partial(emit_toplevel,
+                                                elements=chains)
+
+    tables = dispatch_tables(elements)
+    if tables:
+        directories.append(DISPATCH_MODULE)
+        outputs[DISPATCH_MODULE + '.rs'] = partial(emit_toplevel,
+                                                   elements=tables)
+
+    outputs['mod.rs'] = partial(emit_mod, modules=directories, public=True)
+    return outputs
+
+
+def render_sharded_outputs(elements: Elements,
+                           graph: DependencyGraph = None):
+    return render(sharded_outputs(elements, graph))
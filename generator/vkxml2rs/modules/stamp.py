@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+
+from . import GENERATOR_VERSION
+
+# Kept free of the parsing and rendering modules, so that checking the stamp
+# costs little more than interpreter startup.
+STAMP_NAME = '.vkxml2rs-stamp.json'
+GENERATOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def file_digest(path: str):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def generator_sources():
+    sources = []
+    for directory, dirs, files in os.walk(GENERATOR_DIR):
+        dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+        sources += [os.path.join(directory, name)
+                    for name in sorted(files) if name.endswith('.py')]
+    return sources
+
+
+def generator_digest():
+    sha256 = hashlib.sha256()
+    for path in generator_sources():
+        sha256.update(os.path.relpath(path, GENERATOR_DIR).encode())
+        sha256.update(file_digest(path).encode())
+    return sha256.hexdigest()
+
+
+def stamp_inputs(xml_path: str, options: dict):
+    return {
+        'version': GENERATOR_VERSION,
+        'generator': generator_digest(),
+        'registry': file_digest(xml_path),
+        'options': options,
+    }
+
+
+def is_up_to_date(out_dir: str, inputs: dict):
+    try:
+        with open(os.path.join(out_dir, STAMP_NAME)) as f:
+            return json.load(f) == inputs
+    except (OSError, ValueError):
+        return False
+
+
+def write_stamp(out_dir: str, inputs: dict):
+    path = os.path.join(out_dir, STAMP_NAME)
+    tmp_path = path + '.' + str(os.getpid()) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(inputs, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, path)
@@ -0,0 +1,69 @@
+from .elements import *
+
+
+class SymbolIndex:
+    def __init__(self, elements: Elements):
+        self.aliases = elements.aliases
+        self.symbols = {}
+
+        categories = [
+            elements.constants,
+            elements.basetypes,
+            elements.handles,
+            elements.functionpointers,
+            elements.enums,
+            elements.structs,
+            elements.unions,
+            elements.commands,
+        ]
+        for category in categories:
+            for element in category:
+                self.symbols[element.name] = element
+
+        for enums in elements.enums:
+            for enum in enums.enums:
+                self.symbols[enum.name] = enum
+
+    def __contains__(self, name: str):
+        return self.lookup(name) is not None
+
+    def __getitem__(self, name: str):
+        symbol = self.lookup(name)
+        if symbol is None:
+            raise KeyError(name)
+        return symbol
+
+    def lookup(self, name: str):
+        seen = set()
+        while name not in self.symbols:
+            if name not in self.aliases or name in seen:
+                return None
+            seen.add(name)
+            name = self.aliases[name]
+        return self.symbols[name]
+
+    def resolve_enum(self, enum: Enum):
+        chain = []
+        seen = set()
+        while enum.value is None:
+            assert enum.name not in seen, 'Cyclic alias: ' + enum.name
+            seen.add(enum.name)
+            chain.append(enum)
+            target = self.symbols.get(enum.alias)
+            assert isinstance(target, Enum), 'Unknown alias: ' + enum.alias
+            enum = target
+
+        for e in chain:
+            e.value = enum.value
+
+        return enum.value
+
+
+def resolve_aliases(elements: Elements):
+    index = SymbolIndex(elements)
+    for enums in elements.enums:
+        for enum in enums.enums:
+            if enum.value is None:
+                index.resolve_enum(enum)
+
+    return index
@@ -0,0 +1,73 @@
+import dataclasses
+import hashlib
+import os
+import time
+
+from .elements import *
+from .parse import (merge_elements, merge_extension_enums, parse_section,
+                    registry_sections)
+from .symbols import resolve_aliases
+
+
+def file_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def watch(paths: list, interval: float = 0.2):
+    # Polls instead of relying on a platform file notification API. Yields
+    # the changed paths every time any of them changes.
+    signatures = dict((path, file_signature(path)) for path in paths)
+    while True:
+        time.sleep(interval)
+        current = dict((path, file_signature(path)) for path in paths)
+        changed = [path for path in paths if current[path] != signatures[path]]
+        if changed:
+            signatures = current
+            yield changed
+
+
+def copy_section(elements: Elements, pending: dict):
+    # merge_extension_enums and resolve_aliases update enum blocks in place,
+    # so kept sections hand out copies of them.
+    enums = [Enums(e.name, [dataclasses.replace(v) for v in e.enums],
+                   e.bitmask, e.bitwidth)
+             for e in elements.enums]
+    pending = dict((name, [dataclasses.replace(v) for v in values])
+                   for name, values in pending.items())
+    return dataclasses.replace(elements, enums=enums), pending
+
+
+class IncrementalRegistry:
+    # Keeps every parsed top level section of a registry in memory, so that
+    # after an edit only the sections whose bytes changed are parsed again.
+    def __init__(self, xml_path: str):
+        self.xml_path = xml_path
+        self.sections = {}
+        self.reparsed = 0
+
+    def load(self):
+        with open(self.xml_path, 'rb') as f:
+            data = f.read()
+
+        sections = {}
+        self.reparsed = 0
+        elements = Elements()
+        pending = {}
+        for start, end in registry_sections(data):
+            chunk = data[start:end]
+            digest = hashlib.sha256(chunk).digest()
+            section = self.sections.get(digest)
+            if section is None:
+                section = parse_section(chunk)
+                self.reparsed += 1
+            sections[digest] = section
+            merge_elements(elements, pending, *copy_section(*section))
+
+        self.sections = sections
+        merge_extension_enums(elements, pending)
+        resolve_aliases(elements)
+        return elements
@@ -1,4 +1,175 @@
+import argparse
+import time
 
-def vkxml2rs(path: str):
-    pass
-    # elements = parse(path)
+# Everything else is imported where it is used, so that an up to date
+# stamp is answered without loading the parser and renderers.
+from modules.stamp import is_up_to_date, stamp_inputs, write_stamp
+
+LAYOUTS = ['single', 'sharded']
+
+
+def layout_outputs(layout: str):
+    from modules.render import single_outputs, sharded_outputs
+
+    return {'single': single_outputs, 'sharded': sharded_outputs}[layout]
+
+
+def vkxml2rs(path: str, out_dir: str, cache_dir: str = None,
+             layout: str = 'single', api_version: str = None,
+             extensions: list = None, jobs: int = 1, profiler=None):
+    from modules.cache import load_elements
+    from modules.profile import Profiler
+
+    if profiler is None:
+        profiler = Profiler()
+
+    with profiler.phase('load'):
+        elements = load_elements(path, cache_dir, jobs, profiler)
+    return generate(elements, out_dir, layout, api_version, extensions, jobs,
+                    profiler)
+
+
+def generate(elements, out_dir: str, layout: str = 'single',
+             api_version: str = None, extensions: list = None,
+             jobs: int = 1, profiler=None):
+    from modules.filter import filter_elements
+    from modules.graph import DependencyGraph
+    from modules.output import write_outputs
+    from modules.profile import Profiler, alias_count, element_counts
+    from modules.render import render
+
+    if profiler is None:
+        profiler = Profiler()
+
+    profiler.set('registry_counts', element_counts(elements))
+    profiler.set('aliases_resolved', alias_count(elements))
+
+    with profiler.phase('graph'):
+        graph = DependencyGraph(elements)
+    profiler.set('pointer_cycles', len(graph.cycles))
+
+    with profiler.phase('filter'):
+        elements = filter_elements(elements, api_version, extensions, graph)
+    profiler.set('emitted_counts', element_counts(elements))
+
+    with profiler.phase('emit'):
+        outputs = layout_outputs(layout)(elements, graph)
+        if jobs > 1:
+            outputs = render(outputs, jobs)
+        report = write_outputs(out_dir, outputs)
+
+    profiler.set('outputs', {
+        'added': len(report.added),
+        'changed': len(report.changed),
+        'removed': len(report.removed),
+        'unchanged': len(report.unchanged),
+        'bytes_generated': report.bytes_generated,
+        'bytes_written': report.bytes_written,
+    })
+    return report
+
+
+def print_report(report):
+    for path in report.added:
+        print('added: ' + path)
+    for path in report.changed:
+        print('changed: ' + path)
+    for path in report.removed:
+        print('removed: ' + path)
+    print(str(len(report.unchanged)) + ' unchanged')
+
+
+def watch_registry(path: str, out_dir: str, layout: str = 'single',
+                   api_version: str = None, extensions: list = None,
+                   interval: float = 0.2):
+    from modules.watch import IncrementalRegistry, watch
+
+    # The registry stays parsed between changes. Only edited sections are
+    # parsed again, and only outputs whose content changed are written.
+    registry = IncrementalRegistry(path)
+    registry.load()
+    print('watching ' + path)
+    for changed in watch([path], interval):
+        start = time.perf_counter()
+        try:
+            elements = registry.load()
+            report = generate(elements, out_dir, layout, api_version,
+                              extensions)
+        except Exception as e:
+            # Most likely a half saved file, which can fail anywhere in
+            # parsing or merging. The next change retries.
+            print('error: %s: %s' % (type(e).__name__, e))
+            continue
+        print_report(report)
+        print('regenerated in %.0f ms, %d sections parsed' % (
+            (time.perf_counter() - start) * 1000, registry.reparsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Convert vk.xml to rust source files.')
+
+    parser.add_argument('src', help='vk.xml path.')
+    parser.add_argument('dst', help='Output directory path.')
+    parser.add_argument('--cache-dir', help='Parsed registry cache path.')
+    parser.add_argument('--layout', choices=LAYOUTS,
+                        default='single',
+                        help='Write one file or a module tree split by '
+                        'category and extension.')
+    parser.add_argument('--api-version',
+                        help='Emit only what this API version (e.g. 1.1) '
+                        'requires.')
+    parser.add_argument('--extension', action='append', dest='extensions',
+                        help='Also emit what this extension requires. '
+                        'May be repeated.')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Number of worker processes.')
+    parser.add_argument('--profile',
+                        help='Write a JSON report of per phase timings and '
+                        'counts to this path.')
+    parser.add_argument('--profile-top', type=int, default=0,
+                        help='Also profile with cProfile and report this '
+                        'many hot functions.')
+    parser.add_argument('--force', action='store_true',
+                        help='Regenerate even if the stamp in dst says the '
+                        'outputs are up to date.')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and regenerate whenever src '
+                        'changes.')
+    parser.add_argument('--watch-interval', type=float, default=0.2,
+                        help='Seconds between checks for changes.')
+
+    args = parser.parse_args()
+
+    inputs = stamp_inputs(args.src, {
+        'layout': args.layout,
+        'api_version': args.api_version,
+        'extensions': args.extensions,
+    })
+    fast_path = not (args.force or args.profile or args.watch)
+    if fast_path and is_up_to_date(args.dst, inputs):
+        print('up to date')
+        return
+
+    from modules.profile import Profiler
+
+    profiler = Profiler(args.profile_top)
+    report = vkxml2rs(args.src, args.dst, args.cache_dir, args.layout,
+                      args.api_version, args.extensions, args.jobs,
+                      profiler)
+    print_report(report)
+    write_stamp(args.dst, inputs)
+
+    if args.profile:
+        profiler.write(args.profile)
+
+    if args.watch:
+        try:
+            watch_registry(args.src, args.dst, args.layout, args.api_version,
+                           args.extensions, args.watch_interval)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
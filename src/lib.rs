@@ -1,3 +1,10 @@
+#![allow(non_camel_case_types, non_snake_case, non_upper_case_globals)]
+
+#[cfg(vk_bindings)]
+pub mod vk {
+    include!(concat!(env!("OUT_DIR"), "/vk/vk.rs"));
+}
+
 #[cfg(test)]
 mod tests {
     #[test]